@@ -3,22 +3,21 @@ from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
-from django.core.paginator import Paginator
 from django.http import JsonResponse
 import json
 
 from .models import Artist
 from products.models import Product
+from products.pagination import CursorPaginator
 from products.forms import ProductForm, PictureFormSet
 
 # Create your views here.
 def artist_list(request):
     artists = Artist.objects.filter(availability=True)
     
-    # Pagination
-    paginator = Paginator(artists, 12)  # Show 12 artists per page
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination
+    paginator = CursorPaginator(artists, 12)  # Show 12 artists per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     context = {
         'page_obj': page_obj,
@@ -28,12 +27,11 @@ def artist_list(request):
 
 def artist_detail(request, pk):
     artist = get_object_or_404(Artist, pk=pk)
-    products = Product.objects.filter(artist=artist, available=True)
+    products = Product.objects.filter(artist=artist, available=True).with_card_data()
     
-    # Pagination
-    paginator = Paginator(products, 8)  # Show 8 products per page
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination
+    paginator = CursorPaginator(products, 8)  # Show 8 products per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     context = {
         'artist': artist,
@@ -56,7 +54,7 @@ def artist_dashboard(request):
     )
     
     # Get artist's products
-    products = Product.objects.filter(artist=artist)
+    products = Product.objects.filter(artist=artist).with_card_data()
     
     # Calculate counts for dashboard stats
     available_products_count = products.filter(available=True).count()
@@ -1,15 +1,15 @@
-from .models import Cart
+from django.utils.functional import SimpleLazyObject
+
+from .utils import cart_count, get_cart
 
 def cart(request):
     """
-    Context processor to make cart available in all templates
+    Context processor to make cart available in all templates.
+
+    Both are lazy: a page that doesn't show them costs no query, and the
+    badge count comes from the session rather than the cart tables.
     """
-    if request.user.is_authenticated:
-        cart, created = Cart.objects.get_or_create(user=request.user)
-    elif request.session.session_key:
-        cart, created = Cart.objects.get_or_create(session_id=request.session.session_key)
-    else:
-        request.session.create()
-        cart, created = Cart.objects.get_or_create(session_id=request.session.session_key)
-    
-    return {'cart': cart}
+    return {
+        'cart': SimpleLazyObject(lambda: get_cart(request)),
+        'cart_count': SimpleLazyObject(lambda: cart_count(request)),
+    }
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cart.models import Cart
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete the database carts of anonymous visitors. New anonymous carts live in a cookie or '
+        'the session, so these rows are left over from before and are no longer read.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Keep carts changed in the last DAYS days')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        stale = Cart.objects.filter(user__isnull=True, updated_at__lt=cutoff, reservations__isnull=True)
+        deleted, _rows = stale.delete()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} rows deleted (carts and their lines)'))
@@ -1,5 +1,7 @@
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Count, F, Prefetch, Sum, prefetch_related_objects
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from products.models import Product
 
@@ -19,11 +21,153 @@ class Cart(models.Model):
             return f'Cart for {self.user.username}'
         return f'Cart {self.id}'
     
+    def get_totals(self):
+        """
+        Lines, pieces and cost (at the price the buyer pays) in one aggregate
+        query, remembered on the instance: a page or AJAX answer that shows
+        several of them still runs it once.
+        """
+        if not hasattr(self, '_totals'):
+            totals = self.items.aggregate(
+                line_count=Count('id'),
+                piece_count=Sum('quantity'),
+                cost=Sum(F('quantity') * F('product__effective_price'), output_field=models.DecimalField(max_digits=12, decimal_places=2)),
+            )
+            self._totals = {
+                'count': totals['line_count'],
+                'quantity': totals['piece_count'] or 0,
+                'cost': totals['cost'] or 0,
+            }
+        return self._totals
+    
+    def forget_totals(self):
+        """Drop the remembered totals after changing the lines"""
+        self.__dict__.pop('_totals', None)
+    
     def get_total_cost(self):
-        return sum(item.get_cost() for item in self.items.all())
+        return self.get_totals()['cost']
     
     def get_total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.get_totals()['quantity']
+    
+    get_total_quantity = get_total_items
+    
+    def get_line_count(self):
+        return self.get_totals()['count']
+    
+    def prefetch_items(self):
+        """Load the lines with their products' card data for display"""
+        prefetch_related_objects([self], Prefetch('items', queryset=CartItem.objects.with_card_data()))
+    
+    def quantities(self):
+        return dict(self.items.values_list('product_id', 'quantity'))
+    
+    def _add_lines_sql(self, quantities):
+        """
+        INSERT ... ON CONFLICT adding {product id: quantity} to the lines'
+        quantities, inserting the missing lines: (sql, params)
+        """
+        table = connection.ops.quote_name(CartItem._meta.db_table)
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        sql = (
+            f'INSERT INTO {table} (cart_id, product_id, quantity, created_at, updated_at) '
+            f'VALUES {", ".join(["(%s, %s, %s, %s, %s)"] * len(quantities))} '
+        )
+        if connection.vendor == 'mysql':
+            sql += 'ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity), updated_at = VALUES(updated_at)'
+        else:
+            # PostgreSQL, SQLite 3.24+
+            sql += (
+                f'ON CONFLICT (cart_id, product_id) DO UPDATE SET '
+                f'quantity = {table}.quantity + excluded.quantity, updated_at = excluded.updated_at'
+            )
+        params = []
+        for product_id, quantity in quantities.items():
+            params += [self.pk, product_id, quantity, now, now]
+        return sql, params
+    
+    def add(self, product, quantity):
+        """
+        Add ``quantity`` pieces of ``product`` with a single INSERT ... ON
+        CONFLICT statement, so double clicks add up instead of racing on
+        the unique line constraint. True if it was not in the cart yet.
+        """
+        sql, params = self._add_lines_sql({product.pk: quantity})
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute(sql, params)
+                # 1 row affected for an insert, 2 for an update
+                created = cursor.rowcount == 1
+            else:
+                # PostgreSQL, SQLite 3.35+
+                cursor.execute(sql + ' RETURNING quantity', params)
+                created = cursor.fetchone()[0] == quantity
+        self.forget_totals()
+        return created
+    
+    def _upsert_lines(self, quantities):
+        """Set {product id: quantity} on the lines, inserting the missing ones, in one statement"""
+        CartItem.objects.bulk_create(
+            [CartItem(cart=self, product_id=product_id, quantity=quantity) for product_id, quantity in quantities.items()],
+            update_conflicts=True,
+            # MySQL picks the conflicting unique key itself
+            unique_fields=['cart', 'product'] if connection.features.supports_update_conflicts_with_target else None,
+            update_fields=['quantity', 'updated_at'],
+        )
+    
+    def set_quantity(self, product, quantity):
+        """Set the quantity of ``product`` in one upsert (0 removes it)"""
+        if quantity > 0:
+            self._upsert_lines({product.pk: quantity})
+            self.forget_totals()
+        else:
+            self.remove(product)
+    
+    def apply_quantities(self, quantities):
+        """
+        Apply {product id: quantity} from the cart page at once: one DELETE
+        for the zeroed lines and one upsert for the rest, in a transaction.
+        """
+        removed = [product_id for product_id, quantity in quantities.items() if quantity <= 0]
+        kept = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+        with transaction.atomic():
+            if removed:
+                self.items.filter(product_id__in=removed).delete()
+            if kept:
+                self._upsert_lines(kept)
+        self.forget_totals()
+    
+    def remove(self, product):
+        """Drop ``product`` from the cart; True if it was there"""
+        deleted, _rows = self.items.filter(product=product).delete()
+        self.forget_totals()
+        return bool(deleted)
+    
+    def clear(self):
+        self.items.all().delete()
+        self.forget_totals()
+    
+    def merge(self, quantities):
+        """
+        Add {product id: quantity} (a cart filled before signing in) to the
+        lines in one upsert that does the addition itself, like ``add``, so
+        a concurrent add isn't lost. Products that are gone, unavailable or
+        the user's own are dropped.
+        """
+        product_ids = list(
+            Product.objects.filter(pk__in=list(quantities), available=True)
+            .exclude(artist__user=self.user_id).values_list('pk', flat=True)
+        )
+        if not product_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(*self._add_lines_sql({product_id: quantities[product_id] for product_id in product_ids}))
+        self.forget_totals()
+
+class CartItemQuerySet(models.QuerySet):
+    def with_card_data(self):
+        """Cart lines with the product card data (artist, main picture) joined in"""
+        return self.select_related('product__artist', 'product__main_picture')
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
@@ -32,6 +176,8 @@ class CartItem(models.Model):
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
     
+    objects = CartItemQuerySet.as_manager()
+    
     class Meta:
         verbose_name = _('cart item')
         verbose_name_plural = _('cart items')
@@ -43,6 +189,4 @@ class CartItem(models.Model):
         return f'{self.quantity}x {self.product.name}'
     
     def get_cost(self):
-        if self.product.discount_price:
-            return self.product.discount_price * self.quantity
-        return self.product.price * self.quantity
+        return self.product.effective_price * self.quantity
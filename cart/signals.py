@@ -0,0 +1,17 @@
+from django.contrib.auth.signals import user_logged_in
+from django.dispatch import receiver
+
+from .models import Cart
+from .storage import anonymous_cart
+
+
+@receiver(user_logged_in)
+def merge_anonymous_cart(sender, request, user, **kwargs):
+    """Move what the visitor put in their cart before signing in to their database cart"""
+    if request is None:
+        return
+    anonymous = anonymous_cart(request)
+    if anonymous.lines:
+        cart, created = Cart.objects.get_or_create(user=user)
+        cart.merge(anonymous.quantities())
+        anonymous.clear()
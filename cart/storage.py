@@ -0,0 +1,212 @@
+"""
+Anonymous carts.
+
+Signed-in users keep their cart in the database (``Cart``/``CartItem``):
+checkout reserves stock against it. Anonymous visitors get a compact
+{product id: quantity} payload instead, so browsing and filling a cart
+write no rows. ``CART_ANONYMOUS_STORAGE`` picks where the payload lives:
+
+- ``'cookie'`` (default): a signed cookie, written by ``CartCookieMiddleware``
+- ``'session'``: the visitor's session
+
+Both offer the part of ``Cart`` the views and templates use (``add``,
+``set_quantity``, ``apply_quantities``, ``remove``, ``clear``, ``items``,
+the totals). When the
+visitor signs in, the payload is merged into their database cart with one
+upsert (see ``cart.signals``).
+"""
+from django.conf import settings
+
+from products.models import Product
+
+COOKIE_NAME = 'cart'
+COOKIE_SALT = 'cart.storage'
+COOKIE_MAX_AGE = 30 * 24 * 60 * 60
+SESSION_KEY = 'cart_lines'
+# Browsers drop cookies over 4KB; this many "id:quantity" pairs stay well below
+MAX_LINES = 50
+
+
+class CartFull(Exception):
+    pass
+
+
+class CartLine:
+    """One line of an anonymous cart, shaped like a CartItem for the templates"""
+
+    def __init__(self, product, quantity):
+        self.product = product
+        self.product_id = product.pk
+        self.quantity = quantity
+
+    def get_cost(self):
+        return self.product.effective_price * self.quantity
+
+
+class CartLines(list):
+    """The lines as ``cart.items``, with the related manager calls templates make"""
+
+    def all(self):
+        return self
+
+    def exists(self):
+        return bool(self)
+
+
+class AnonymousCart:
+    modified = False
+
+    def __init__(self, request):
+        self.request = request
+        self.lines = self.load()
+        self._items = None
+
+    def load(self):
+        """{product id: quantity} from the storage"""
+        raise NotImplementedError
+
+    def save(self):
+        pass
+
+    def _changed(self):
+        self.modified = True
+        self._items = None
+        self.save()
+
+    def quantities(self):
+        return dict(self.lines)
+
+    def add(self, product, quantity):
+        """Add ``quantity`` pieces of ``product``; True if it was not in the cart yet"""
+        added = product.pk not in self.lines
+        if added and len(self.lines) >= MAX_LINES:
+            raise CartFull
+        self.lines[product.pk] = self.lines.get(product.pk, 0) + quantity
+        self._changed()
+        return added
+
+    def set_quantity(self, product, quantity):
+        """Set the quantity of ``product`` (0 removes it)"""
+        self.apply_quantities({product.pk: quantity})
+
+    def apply_quantities(self, quantities):
+        """Apply {product id: quantity} (0 removes the line) at once"""
+        lines = dict(self.lines)
+        for product_id, quantity in quantities.items():
+            if quantity > 0:
+                lines[product_id] = quantity
+            else:
+                lines.pop(product_id, None)
+        if len(lines) > MAX_LINES:
+            raise CartFull
+        self.lines = lines
+        self._changed()
+
+    def remove(self, product):
+        """Drop ``product`` from the cart; True if it was there"""
+        if self.lines.pop(product.pk, None) is None:
+            return False
+        self._changed()
+        return True
+
+    def clear(self):
+        if self.lines:
+            self.lines = {}
+            self._changed()
+
+    @property
+    def items(self):
+        """The lines with their products' card data, loaded in one query"""
+        if self._items is None:
+            products = Product.objects.with_card_data().in_bulk(list(self.lines))
+            self._items = CartLines(
+                CartLine(products[product_id], quantity)
+                for product_id, quantity in self.lines.items() if product_id in products
+            )
+        return self._items
+
+    def prefetch_items(self):
+        pass
+
+    def get_totals(self):
+        lines = self.items
+        return {
+            'count': len(lines),
+            'quantity': sum(line.quantity for line in lines),
+            'cost': sum(line.get_cost() for line in lines),
+        }
+
+    def forget_totals(self):
+        self._items = None
+
+    def get_total_cost(self):
+        return self.get_totals()['cost']
+
+    def get_total_items(self):
+        # Straight from the payload: the navbar badge costs no query
+        return sum(self.lines.values())
+
+    get_total_quantity = get_total_items
+
+    def get_line_count(self):
+        return len(self.lines)
+
+
+def _parse(pairs):
+    lines = {}
+    for product_id, quantity in pairs:
+        try:
+            product_id, quantity = int(product_id), int(quantity)
+        except (TypeError, ValueError):
+            continue
+        if quantity > 0:
+            lines[product_id] = quantity
+    return lines
+
+
+class CookieCart(AnonymousCart):
+    """Lines in a signed cookie ("12:2,40:1"); the middleware writes it back"""
+
+    def load(self):
+        value = self.request.get_signed_cookie(COOKIE_NAME, default='', salt=COOKIE_SALT, max_age=COOKIE_MAX_AGE)
+        return _parse(pair.split(':', 1) for pair in value.split(',') if ':' in pair)
+
+    def write(self, response):
+        if self.lines:
+            value = ','.join(f'{product_id}:{quantity}' for product_id, quantity in self.lines.items())
+            response.set_signed_cookie(
+                COOKIE_NAME, value, salt=COOKIE_SALT, max_age=COOKIE_MAX_AGE,
+                secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax',
+            )
+        else:
+            response.delete_cookie(COOKIE_NAME, samesite='Lax')
+
+
+class SessionCart(AnonymousCart):
+    """Lines in the visitor's session"""
+
+    def load(self):
+        return _parse(self.request.session.get(SESSION_KEY, {}).items())
+
+    def save(self):
+        if self.lines:
+            self.request.session[SESSION_KEY] = {str(product_id): quantity for product_id, quantity in self.lines.items()}
+        else:
+            self.request.session.pop(SESSION_KEY, None)
+
+    def write(self, response):
+        pass  # the session middleware saves it
+
+
+BACKENDS = {
+    'cookie': CookieCart,
+    'session': SessionCart,
+}
+
+
+def anonymous_cart(request):
+    """The visitor's anonymous cart, read once per request"""
+    if not hasattr(request, '_anonymous_cart'):
+        backend = BACKENDS[getattr(settings, 'CART_ANONYMOUS_STORAGE', 'cookie')]
+        request._anonymous_cart = backend(request)
+    return request._anonymous_cart
@@ -7,5 +7,6 @@ urlpatterns = [
     path('', views.cart_detail, name='cart_detail'),
     path('add/<int:product_id>/', views.cart_add, name='cart_add'),
     path('remove/<int:product_id>/', views.cart_remove, name='cart_remove'),
+    path('update/', views.cart_update_batch, name='cart_update_batch'),
     path('update/<int:product_id>/', views.cart_update, name='cart_update'),
 ]
@@ -0,0 +1,58 @@
+"""
+Finding the visitor's cart.
+
+Signed-in users get their database ``Cart``, created the first time it's
+needed. Anonymous visitors get the cart from ``cart.storage`` (a signed
+cookie or the session), so browsing writes nothing. The navbar badge reads
+``cart_count``: free for anonymous carts, and cached in the session for
+database carts and refreshed by the views that change them
+(``remember_count``). The cached count is re-read after ``COUNT_MAX_AGE``
+seconds, so changes made elsewhere (another device, the admin) show up
+without a query on every page.
+"""
+import time
+
+from .models import Cart
+from .storage import anonymous_cart
+
+COUNT_SESSION_KEY = 'cart_count'
+COUNT_MAX_AGE = 60  # seconds
+
+
+def find_cart(request):
+    """The visitor's cart, or None if a signed-in user has none yet; never writes"""
+    if request.user.is_authenticated:
+        return Cart.objects.filter(user=request.user).first()
+    return anonymous_cart(request)
+
+
+def get_cart(request):
+    """The visitor's cart, creating a signed-in user's when missing"""
+    if not request.user.is_authenticated:
+        return anonymous_cart(request)
+    cart = getattr(request, '_cart', None)
+    if cart is None or cart.user_id != request.user.pk:
+        cart, created = Cart.objects.get_or_create(user=request.user)
+        request._cart = cart
+    return cart
+
+
+def remember_count(request, cart):
+    """Cache the number of pieces in a signed-in user's ``cart`` for the navbar badge"""
+    if request.user.is_authenticated:
+        # Keyed to the user: logging in keeps the session but switches carts
+        request.session[COUNT_SESSION_KEY] = [request.user.pk, cart.get_total_items() if cart else 0, time.time()]
+
+
+def cart_count(request):
+    """Pieces in the visitor's cart, without querying the cart tables when possible"""
+    if not request.user.is_authenticated:
+        return anonymous_cart(request).get_total_items()
+    cached = request.session.get(COUNT_SESSION_KEY)
+    # Sessions from before the timestamp hold [user pk, count]: re-read those
+    if cached and len(cached) == 3:
+        user_pk, count, counted_at = cached
+        if user_pk == request.user.pk and time.time() - counted_at < COUNT_MAX_AGE:
+            return count
+    remember_count(request, find_cart(request))
+    return request.session[COUNT_SESSION_KEY][1]
@@ -2,24 +2,35 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
 from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+import json
 
-from .models import Cart, CartItem
+from .storage import CartFull
+from .utils import get_cart, remember_count
 from products.models import Product
 
 # Create your views here.
-def _get_cart(request):
-    """Helper function to get or create cart"""
-    if request.user.is_authenticated:
-        cart, created = Cart.objects.get_or_create(user=request.user)
-    elif request.session.session_key:
-        cart, created = Cart.objects.get_or_create(session_id=request.session.session_key)
-    else:
-        request.session.create()
-        cart, created = Cart.objects.get_or_create(session_id=request.session.session_key)
-    return cart
+def _totals_response(cart, **extra):
+    """AJAX answer with the cart's totals, all from one aggregate query"""
+    totals = cart.get_totals()
+    return JsonResponse({
+        'success': True,
+        'total_items': totals['quantity'],
+        'total_cost': totals['cost'],
+        'line_count': totals['count'],
+        **extra,
+    })
+
+def _cart_full(request):
+    error_message = _('Your cart is full. Sign in to add more products.')
+    messages.error(request, error_message)
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return JsonResponse({'success': False, 'message': error_message})
+    return redirect('cart:cart_detail')
 
 def cart_detail(request):
-    cart = _get_cart(request)
+    cart = get_cart(request)
+    cart.prefetch_items()
     
     context = {
         'cart': cart,
@@ -29,7 +40,7 @@ def cart_detail(request):
 
 def cart_add(request, product_id):
     product = get_object_or_404(Product, id=product_id, available=True)
-    cart = _get_cart(request)
+    cart = get_cart(request)
     
     # Check if the user is an artist and trying to add their own product
     if request.user.is_authenticated and request.user.role == 'artist':
@@ -58,23 +69,18 @@ def cart_add(request, product_id):
     
     quantity = int(request.POST.get('quantity', 1))
     
-    # Check if product already in cart
     try:
-        cart_item = CartItem.objects.get(cart=cart, product=product)
-        cart_item.quantity += quantity
-        cart_item.save()
-        messages.success(request, _('Cart updated successfully!'))
-    except CartItem.DoesNotExist:
-        CartItem.objects.create(cart=cart, product=product, quantity=quantity)
-        messages.success(request, _('Product added to cart!'))
+        if cart.add(product, quantity):
+            messages.success(request, _('Product added to cart!'))
+        else:
+            messages.success(request, _('Cart updated successfully!'))
+    except CartFull:
+        return _cart_full(request)
+    remember_count(request, cart)
     
     # Handle AJAX requests
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        return JsonResponse({
-            'success': True,
-            'total_items': cart.get_total_items(),
-            'total_cost': cart.get_total_cost(),
-        })
+        return _totals_response(cart)
     
     # Get the next parameter or default to cart detail
     next_url = request.POST.get('next', 'cart:cart_detail')
@@ -82,56 +88,65 @@ def cart_add(request, product_id):
 
 def cart_remove(request, product_id):
     product = get_object_or_404(Product, id=product_id)
-    cart = _get_cart(request)
+    cart = get_cart(request)
     
-    try:
-        cart_item = CartItem.objects.get(cart=cart, product=product)
-        cart_item.delete()
+    if cart.remove(product):
         messages.success(request, _('Product removed from cart!'))
-    except CartItem.DoesNotExist:
-        pass
+    remember_count(request, cart)
     
     # Handle AJAX requests
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        return JsonResponse({
-            'success': True,
-            'total_items': cart.get_total_items(),
-            'total_cost': cart.get_total_cost(),
-        })
+        return _totals_response(cart)
     
     return redirect('cart:cart_detail')
 
 def cart_update(request, product_id):
     product = get_object_or_404(Product, id=product_id)
-    cart = _get_cart(request)
+    cart = get_cart(request)
     
     quantity = int(request.POST.get('quantity', 1))
     
     try:
-        cart_item = CartItem.objects.get(cart=cart, product=product)
         if quantity > 0:
-            cart_item.quantity = quantity
-            cart_item.save()
+            cart.set_quantity(product, quantity)
             messages.success(request, _('Cart updated successfully!'))
-        else:
-            cart_item.delete()
+        elif cart.remove(product):
             messages.success(request, _('Product removed from cart!'))
-    except CartItem.DoesNotExist:
-        if quantity > 0:
-            cart_item = CartItem.objects.create(cart=cart, product=product, quantity=quantity)
-            messages.success(request, _('Product added to cart!'))
-        else:
-            cart_item = None
+    except CartFull:
+        return _cart_full(request)
+    remember_count(request, cart)
     
     # Handle AJAX requests
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        item_cost = cart_item.get_cost() if cart_item else 0
-        
-        return JsonResponse({
-            'success': True,
-            'total_items': cart.get_total_items(),
-            'total_cost': cart.get_total_cost(),
-            'item_cost': item_cost,
-        })
+        item_cost = product.effective_price * quantity if quantity > 0 else 0
+        return _totals_response(cart, item_cost=item_cost)
     
     return redirect('cart:cart_detail')
+
+@require_POST
+def cart_update_batch(request):
+    """
+    Apply the quantities changed on the cart page in one request, as JSON
+    {"quantities": {"<product id>": quantity}} (0 removes the line).
+    """
+    try:
+        data = json.loads(request.body)
+        quantities = {int(product_id): int(quantity) for product_id, quantity in data['quantities'].items()}
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return JsonResponse({'success': False, 'message': _('Invalid request.')}, status=400)
+    cart = get_cart(request)
+    
+    # Lines can always be removed; only products still for sale (and not the artist's own) can be set
+    purchasable = Product.objects.filter(pk__in=[pk for pk, quantity in quantities.items() if quantity > 0], available=True)
+    if request.user.is_authenticated:
+        purchasable = purchasable.exclude(artist__user=request.user)
+    purchasable = set(purchasable.values_list('pk', flat=True))
+    quantities = {pk: quantity for pk, quantity in quantities.items() if quantity <= 0 or pk in purchasable}
+    
+    try:
+        cart.apply_quantities(quantities)
+    except CartFull:
+        return _cart_full(request)
+    remember_count(request, cart)
+    messages.success(request, _('Cart updated successfully!'))
+    return _totals_response(cart)
@@ -1,5 +1,4 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.core.paginator import Paginator
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
@@ -7,6 +6,9 @@ from django.template.defaulttags import register
 
 from .models import Category
 from products.models import Product
+from products.counts import craft_category_counts
+from products.filters import ProductFilter, build_facets, facet_total, sort_controls, sort_ordering
+from products.pagination import CursorPaginator
 from artists.models import Artist
 from .forms import CategoryForm
 
@@ -37,14 +39,9 @@ def craft_category_list(request):
     # Get craft categories from Product model choices
     craft_categories = Product.CRAFT_CHOICES
     
-    # Count products for each craft category
-    craft_products_count = {}
-    for craft_id, craft_name in craft_categories:
-        craft_products_count[craft_id] = Product.objects.filter(craft_category=craft_id, available=True).count()
-    
     context = {
         'craft_categories': craft_categories,
-        'craft_products_count': craft_products_count,
+        'craft_products_count': craft_category_counts(),
         'title': _('Craft Categories'),
     }
     return render(request, 'categories/craft_category_list.html', context)
@@ -60,18 +57,25 @@ def craft_category_detail(request, craft_id):
         return redirect('categories:craft_category_list')
     
     # Get products for this craft category
-    products = Product.objects.filter(craft_category=craft_id, available=True)
+    products = Product.objects.filter(craft_category=craft_id, available=True).with_card_data()
+    
+    # Facet filters (the craft type is fixed by the page)
+    filterset = ProductFilter(request.GET, queryset=products)
+    facets = build_facets(request, products, filterset, exclude=('craft_category',))
     
-    # Pagination
-    paginator = Paginator(products, 12)  # Show 12 products per page
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination, newest first unless sorted by price
+    _sort, ordering = sort_ordering(request)
+    paginator = CursorPaginator(filterset.qs, 12, ordering)  # Show 12 products per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     context = {
         'craft_id': craft_id,
         'craft_name': craft_name,
-        'products': products,
+        'product_count': facet_total(products, filterset),
         'page_obj': page_obj,
+        'filterset': filterset,
+        'facets': facets,
+        'sorting': sort_controls(request, filterset, _('Newest')),
         'title': craft_name,
     }
     return render(request, 'categories/craft_category_detail.html', context)
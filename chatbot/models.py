@@ -41,6 +41,9 @@ class ChatMessage(models.Model):
         verbose_name = _('chat message')
         verbose_name_plural = _('chat messages')
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['session', 'timestamp'], name='chatmessage_session_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.message_type}: {self.content[:50]}..."
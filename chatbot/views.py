@@ -13,6 +13,7 @@ from datetime import datetime, timedelta
 
 from .models import ChatSession, ChatMessage, FAQ
 from products.models import Product
+from products.counts import craft_category_counts
 from categories.models import Category
 from artists.models import Artist
 
@@ -158,13 +159,12 @@ What would you like to know?"""
             Q(description__icontains=message) |
             Q(craft_category__icontains=message),
             available=True
-        )[:5]
+        ).select_related('artist')[:5]
         
         if products:
             response = "I found some products that might interest you:\n\n"
             for product in products:
-                price = product.discount_price if product.discount_price else product.price
-                response += f"🛍️ **{product.name}** - {price} DZD\n"
+                response += f"🛍️ **{product.name}** - {product.effective_price} DZD\n"
                 response += f"   By {product.artist.name}\n"
                 response += f"   {product.description[:100]}...\n\n"
             response += "Would you like to know more about any specific product?"
@@ -200,10 +200,11 @@ What would you like to know?"""
     def search_categories(self, message):
         """Search for categories based on message"""
         categories = Product.CRAFT_CHOICES
+        counts = craft_category_counts()
         response = "Here are our craft categories:\n\n"
         
         for code, name in categories:
-            response += f"• **{name}**\n"
+            response += f"• **{name}** ({counts[code]} products)\n"
         
         response += "\nYou can ask me about products in any of these categories!"
         return response
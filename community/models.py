@@ -39,11 +39,20 @@ class Post(models.Model):
     
     # Video field for posts
     video = models.FileField(_('video'), upload_to='community/posts/videos', blank=True, null=True)
+    # Filled in by products.videos once the video has been processed
+    video_duration = models.FloatField(_('video duration'), null=True, blank=True, editable=False)
+    video_width = models.PositiveIntegerField(_('video width'), null=True, blank=True, editable=False)
+    video_height = models.PositiveIntegerField(_('video height'), null=True, blank=True, editable=False)
+    video_processed_at = models.DateTimeField(_('video processed at'), null=True, blank=True, editable=False)
     
     class Meta:
         verbose_name = _('post')
         verbose_name_plural = _('posts')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='post_created_idx'),
+            models.Index(fields=['is_public', '-created_at'], name='post_public_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} by {self.author.username}"
@@ -157,6 +166,10 @@ class Message(models.Model):
         verbose_name = _('message')
         verbose_name_plural = _('messages')
         ordering = ['-created_at']
+        indexes = [
+            # Unread badge in the navbar
+            models.Index(fields=['recipient', 'is_read'], name='message_unread_idx'),
+        ]
     
     def __str__(self):
         if self.shared_post:
@@ -204,6 +217,9 @@ class Activity(models.Model):
         verbose_name = _('activity')
         verbose_name_plural = _('activities')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='activity_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username}: {self.get_activity_type_display()}"
@@ -236,6 +252,10 @@ class Notification(models.Model):
         verbose_name = _('notification')
         verbose_name_plural = _('notifications')
         ordering = ['-created_at']
+        indexes = [
+            # Unread badge in the navbar
+            models.Index(fields=['recipient', 'is_read'], name='notification_unread_idx'),
+        ]
     
     def __str__(self):
         return f"Notification for {self.recipient.username}: {self.message}"
@@ -0,0 +1,159 @@
+"""
+Media serving for deployments that keep uploads on local disk.
+
+``django.views.static.serve`` is only meant for development: it reads files
+through Python, ignores ``Range`` (so videos can't be seeked) and sends no
+caching headers. ``serve_media`` answers conditional requests with ``304``,
+single byte ranges with ``206`` and marks files cacheable for a long time
+(uploads are never overwritten: storage picks a fresh name instead).
+
+The file itself is handed to the front-end server when one is configured:
+``MEDIA_ACCEL_REDIRECT`` (an nginx ``internal`` location aliased to
+``MEDIA_ROOT``) or ``MEDIA_X_SENDFILE`` (Apache mod_xsendfile, lighttpd).
+Otherwise the response wraps the open file so gunicorn's
+``wsgi.file_wrapper`` sends it with ``sendfile()`` and the worker does not
+copy the bytes through Python.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+CACHE_MAX_AGE = getattr(settings, 'MEDIA_CACHE_MAX_AGE', 365 * 24 * 60 * 60)
+BLOCK_SIZE = 64 * 1024  # when the server has no sendfile
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """
+    ``length`` bytes of an open file, starting at its current position.
+    Keeps ``fileno()`` so gunicorn can still ``sendfile()`` the range: it
+    starts at the descriptor's offset and stops at ``Content-Length``.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def make_etag(stat_result):
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive of a single ``bytes=`` range, ``None`` when the
+    header should be ignored (absent, malformed or several ranges) and
+    ``False`` when no byte of the file is in the range.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if not length or not size:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        return False
+    return start, end
+
+
+def _range_applies(request, etag, mtime):
+    """If-Range: only honour Range while the client's copy is still current"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    date = parse_http_date_safe(if_range)
+    return date is not None and date >= int(mtime)
+
+
+def _offload(response, path, relative_path):
+    prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT', '')
+    if prefix:
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(relative_path)
+    elif getattr(settings, 'MEDIA_X_SENDFILE', False):
+        response['X-Sendfile'] = path
+    else:
+        return False
+    return True
+
+
+@require_safe
+def serve_media(request, path, document_root=None):
+    document_root = document_root or settings.MEDIA_ROOT
+    fullpath = safe_join(document_root, path)
+    try:
+        stat_result = os.stat(fullpath)
+    except OSError:
+        raise Http404
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404
+
+    etag = make_etag(stat_result)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat_result.st_mtime),
+        'Cache-Control': f'public, max-age={CACHE_MAX_AGE}',
+        'Accept-Ranges': 'bytes',
+    }
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat_result.st_mtime))
+    if not_modified is not None:
+        for header, value in headers.items():
+            not_modified.headers.setdefault(header, value)
+        return not_modified
+
+    content_type = mimetypes.guess_type(fullpath)[0] or 'application/octet-stream'
+    offloaded = HttpResponse(content_type=content_type, headers=headers)
+    if _offload(offloaded, fullpath, path):
+        # The front-end server reads the file and handles Range itself
+        return offloaded
+
+    size = stat_result.st_size
+    byte_range = None
+    if _range_applies(request, etag, stat_result.st_mtime):
+        byte_range = parse_range(request.headers.get('Range'), size)
+    if byte_range is False:
+        return HttpResponse(status=416, headers={**headers, 'Content-Range': f'bytes */{size}'})
+
+    file = open(fullpath, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type, headers=headers)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(FileRange(file, end - start + 1), status=206, content_type=content_type, headers=headers)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response.block_size = BLOCK_SIZE
+    return response
@@ -73,6 +73,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',  # Required by django-allauth
+    'cart.middleware.CartCookieMiddleware',  # Writes anonymous carts back to their cookie
 ]
 
 ROOT_URLCONF = 'crafty.urls'
@@ -133,6 +134,42 @@ else:
         }
     }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Take the write lock when a transaction begins: concurrent checkouts then
+    # queue on the busy timeout instead of failing with "database is locked"
+    # when a read inside the transaction is upgraded to a write
+    DATABASES['default'].setdefault('OPTIONS', {}).setdefault('transaction_mode', 'IMMEDIATE')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHE_URL = os.environ.get('CACHE_URL', '')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    # Redis or a Redis-compatible server (needs the redis package)
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith('file://'):
+    # Shared by every worker process on one machine (e.g. PythonAnywhere)
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_URL[len('file://'):],
+        }
+    }
+else:
+    # Development: per-process memory
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'crafty',
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -191,6 +228,16 @@ else:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Let the front-end server send media files (see crafty/media.py):
+# MEDIA_ACCEL_REDIRECT is an nginx `internal` location aliased to MEDIA_ROOT,
+# MEDIA_X_SENDFILE=true is for Apache mod_xsendfile or lighttpd
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT', '')
+MEDIA_X_SENDFILE = os.environ.get('MEDIA_X_SENDFILE', 'False').lower() == 'true'
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Where anonymous carts live until the visitor signs in: 'cookie' (signed) or 'session'
+CART_ANONYMOUS_STORAGE = os.environ.get('CART_ANONYMOUS_STORAGE', 'cookie')
+
 # Cloudinary configuration for production (media files)
 # Set these environment variables: CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET
 CLOUDINARY_STORAGE = {
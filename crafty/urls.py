@@ -15,11 +15,16 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from django.core.files.storage import FileSystemStorage, default_storage
 from django.utils.translation import gettext_lazy as _
 
+from .media import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('community.urls')),  # Community is now the main homepage
@@ -32,9 +37,15 @@ urlpatterns = [
     path(_('orders/'), include('orders.urls')),
     path('accounts/', include('allauth.urls')),
     path('chatbot/', include('chatbot.urls', namespace='chatbot')),
+    path('api/v1/', include('products.api_urls')),  # Read-only catalog API
     path('i18n/', include('django.conf.urls.i18n')),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+
+# Uploads on local disk (no Cloudinary): ranges, validators and long caching
+if isinstance(default_storage, FileSystemStorage):
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+    ]
@@ -1,7 +1,12 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Sum
+from django.http import JsonResponse
+from django.urls import path
 from django.utils.translation import gettext_lazy as _
 
-from .models import Order, OrderItem
+from . import rollups, stats
+from .models import ArtistOrder, DailyProductSales, DailyWilayaSales, Order, OrderItem, ShippingRate, StockReservation
 
 # Register your models here.
 class OrderItemInline(admin.TabularInline):
@@ -10,16 +15,26 @@ class OrderItemInline(admin.TabularInline):
     extra = 0
     readonly_fields = ('price',)
 
+class ArtistOrderInline(admin.TabularInline):
+    model = ArtistOrder
+    fields = ('artist', 'subtotal', 'shipping_cost', 'status')
+    readonly_fields = ('artist', 'subtotal', 'shipping_cost')
+    extra = 0
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'first_name', 'last_name', 'email', 'status', 'paid', 'created_at')
+    list_display = ('id', 'user', 'first_name', 'last_name', 'email', 'status', 'paid', 'total_cost', 'created_at')
     list_filter = ('status', 'paid', 'created_at')
     search_fields = ('first_name', 'last_name', 'email', 'address', 'city', 'wilaya')
-    readonly_fields = ('created_at', 'updated_at')
-    inlines = [OrderItemInline]
+    readonly_fields = ('total_cost', 'created_at', 'updated_at')
+    inlines = [OrderItemInline, ArtistOrderInline]
     fieldsets = (
         (None, {
-            'fields': ('user', 'status', 'paid')
+            'fields': ('user', 'status', 'paid', 'total_cost', 'shipping_cost')
         }),
         (_('Customer Information'), {
             'fields': ('first_name', 'last_name', 'email', 'phone')
@@ -34,6 +49,26 @@ class OrderAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+    
+    def save_model(self, request, obj, form, change):
+        if change:
+            # Uncount the order as it was; save_related counts it again
+            rollups.subtract([obj.pk])
+        super().save_model(request, obj, form, change)
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Lines edited in the inline change the stored total and the artists' parts
+        form.instance.refresh_total_cost()
+        form.instance.refresh_artist_orders()
+        if 'status' in form.changed_data:
+            # Setting the order's status sets every artist's part
+            form.instance.artist_orders.update(status=form.instance.status)
+            artist_ids = list(form.instance.artist_orders.values_list('artist_id', flat=True))
+            transaction.on_commit(lambda: stats.forget(*artist_ids))
+        else:
+            form.instance.refresh_status()
+        rollups.add([form.instance.pk])
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
@@ -41,3 +76,98 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_filter = ('order',)
     search_fields = ('product__name', 'order__id')
     raw_id_fields = ['product', 'order']
+    
+    def _lines_changed(self, order_ids):
+        """Bring what the orders store about their lines up to date"""
+        for order in Order.objects.filter(pk__in=order_ids):
+            order.refresh_total_cost()
+            order.refresh_artist_orders()
+            order.refresh_status()
+    
+    def save_model(self, request, obj, form, change):
+        # The line may have moved from another order
+        order_ids = list({obj.order_id, form.initial.get('order', obj.order_id)})
+        rollups.subtract(order_ids)
+        super().save_model(request, obj, form, change)
+        self._lines_changed(order_ids)
+        rollups.add(order_ids)
+    
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, OrderItem.objects.filter(pk=obj.pk))
+    
+    def delete_queryset(self, request, queryset):
+        order_ids = list(queryset.values_list('order_id', flat=True).distinct())
+        rollups.subtract(order_ids)
+        super().delete_queryset(request, queryset)
+        self._lines_changed(order_ids)
+        rollups.add(order_ids)
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'cart', 'product', 'quantity', 'expires_at')
+    list_filter = ('expires_at',)
+    search_fields = ('product__name',)
+    raw_id_fields = ['product', 'cart']
+
+@admin.register(ShippingRate)
+class ShippingRateAdmin(admin.ModelAdmin):
+    list_display = ('agency', 'origin_wilaya', 'destination_wilaya', 'price')
+    list_editable = ('price',)
+    list_filter = ('agency', 'origin_wilaya', 'destination_wilaya')
+    search_fields = ('agency',)
+
+class SalesRollupAdmin(admin.ModelAdmin):
+    """Read-only: the rollups are maintained by orders.rollups"""
+    date_hierarchy = 'day'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(DailyProductSales)
+class DailyProductSalesAdmin(SalesRollupAdmin):
+    list_display = ('day', 'artist', 'product', 'orders', 'quantity', 'revenue')
+    list_filter = ('artist',)
+    list_select_related = ('artist', 'product')
+    search_fields = ('product__name', 'artist__name')
+
+@admin.register(DailyWilayaSales)
+class DailyWilayaSalesAdmin(SalesRollupAdmin):
+    """The sales report: daily rows, totals per wilaya and a chart of the selected days"""
+    list_display = ('day', 'wilaya', 'orders', 'quantity', 'revenue')
+    list_filter = ('wilaya',)
+    change_list_template = 'admin/orders/sales_report.html'
+    
+    def get_urls(self):
+        return [
+            path('chart/', self.admin_site.admin_view(self.chart_view), name='orders_dailywilayasales_chart'),
+        ] + super().get_urls()
+    
+    def changelist_view(self, request, extra_context=None):
+        response = super().changelist_view(request, extra_context)
+        try:
+            queryset = response.context_data['cl'].queryset
+        except (AttributeError, KeyError):
+            return response  # a redirect or an error page
+        totals = {'orders': Sum('orders'), 'quantity': Sum('quantity'), 'revenue': Sum('revenue')}
+        response.context_data['per_wilaya'] = queryset.order_by().values('wilaya').annotate(**totals).order_by('-revenue')
+        response.context_data['report_total'] = queryset.aggregate(**totals)
+        return response
+    
+    def chart_view(self, request):
+        """Revenue and orders per day for the report's chart, filtered like the list"""
+        if not self.has_view_permission(request):
+            return JsonResponse({'success': False}, status=403)
+        queryset = self.get_changelist_instance(request).get_queryset(request)
+        days = queryset.order_by().values('day').annotate(orders=Sum('orders'), revenue=Sum('revenue')).order_by('day')
+        return JsonResponse({
+            'success': True,
+            'days': [row['day'].isoformat() for row in days],
+            'orders': [row['orders'] for row in days],
+            'revenue': [str(row['revenue']) for row in days],
+        })
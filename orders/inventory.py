@@ -0,0 +1,165 @@
+"""
+Stock reservation at checkout.
+
+Opening the checkout page takes the cart's quantities off ``Product.stock``
+for ``RESERVATION_MINUTES``; placing the order re-checks the hold and turns
+it into order lines in the same transaction. Stock only ever changes through
+a conditional ``UPDATE ... SET stock = stock - n WHERE stock >= n`` (one
+statement for all of a cart's products), so two buyers can't both get the
+last piece, and product rows are always locked in ascending id order so
+concurrent checkouts can't deadlock. Lock waits are
+capped at ``LOCK_TIMEOUT`` (PostgreSQL, MySQL); a checkout that hits it gets
+``StockBusy`` instead of hanging a worker. SQLite has no row locks: its
+transactions take the database write lock as they begin (``transaction_mode``
+in the settings), so checkouts queue on the busy timeout one at a time.
+
+Abandoned reservations are given back by ``release_expired()``: every
+reservation does it for the products it touches, and the
+``release_stock_reservations`` command sweeps the rest.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from products import catalog_cache
+from products.models import Product
+from .models import StockReservation
+
+RESERVATION_MINUTES = getattr(settings, 'STOCK_RESERVATION_MINUTES', 15)
+LOCK_TIMEOUT = 3  # seconds
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id, requested, available):
+        super().__init__(f'Product {product_id}: {requested} requested, {available} available')
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+
+
+class StockBusy(Exception):
+    """The product rows stayed locked by other checkouts for too long, or changed under this one"""
+
+
+@contextmanager
+def _atomic_with_lock_timeout():
+    """A transaction whose lock waits give up after ``LOCK_TIMEOUT``"""
+    if connection.vendor != 'mysql':
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    # Ends with the transaction
+                    cursor.execute('SET LOCAL lock_timeout = %s', [f'{LOCK_TIMEOUT}s'])
+            yield
+        return
+
+    # MySQL has no per-transaction setting, and the session outlives the
+    # request on persistent connections: put the previous value back after
+    # the transaction, where a rolled back one can't stop the statement
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT @@SESSION.innodb_lock_wait_timeout')
+        previous = cursor.fetchone()[0]
+        cursor.execute('SET SESSION innodb_lock_wait_timeout = %s', [LOCK_TIMEOUT])
+    try:
+        with transaction.atomic():
+            yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SET SESSION innodb_lock_wait_timeout = %s', [previous])
+
+
+def _apply(deltas):
+    """
+    Add {product id: delta} to stock, never letting it go below zero, in two
+    statements however many products there are: lock and read the rows, then
+    one UPDATE with a CASE per product.
+    """
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    stock = dict(
+        Product.objects.select_for_update().filter(pk__in=list(deltas)).order_by('pk').values_list('pk', 'stock')
+    )
+    for product_id in sorted(deltas):
+        if stock.get(product_id, 0) + deltas[product_id] < 0:
+            raise InsufficientStock(product_id, -deltas[product_id], stock.get(product_id, 0))
+
+    def per_product(values):
+        return Case(*[When(pk=product_id, then=Value(value)) for product_id, value in values.items()], output_field=IntegerField())
+
+    # The WHERE still guards databases without row locks (SQLite)
+    updated = Product.objects.filter(pk__in=list(deltas), stock__gte=per_product({pk: -delta for pk, delta in deltas.items()})).update(
+        stock=F('stock') + per_product(deltas),
+    )
+    if updated != len(deltas):
+        # Stock moved between the read and the update
+        raise StockBusy
+
+
+def reserve(cart, quantities, minutes=RESERVATION_MINUTES):
+    """
+    Hold ``quantities`` ({product id: quantity}) for ``cart``, replacing what
+    it held before, and return when the hold expires. Raises
+    ``InsufficientStock`` (and changes nothing) when a product is short.
+    """
+    now = timezone.now()
+    try:
+        with _atomic_with_lock_timeout():
+            held = list(StockReservation.objects.select_for_update().filter(cart=cart))
+            # Other carts' lapsed holds on these products go back first; rows
+            # another transaction is already releasing are skipped, not waited on
+            expired = list(
+                StockReservation.objects.select_for_update(skip_locked=True)
+                .filter(product_id__in=list(quantities), expires_at__lte=now)
+                .exclude(cart=cart)
+            )
+            deltas = Counter()
+            for reservation in held + expired:
+                deltas[reservation.product_id] += reservation.quantity
+            for product_id, quantity in quantities.items():
+                deltas[product_id] -= quantity
+            _apply(deltas)
+
+            StockReservation.objects.filter(pk__in=[reservation.pk for reservation in held + expired]).delete()
+            expires_at = now + timedelta(minutes=minutes)
+            StockReservation.objects.bulk_create([
+                StockReservation(cart=cart, product_id=product_id, quantity=quantity, expires_at=expires_at)
+                for product_id, quantity in quantities.items() if quantity > 0
+            ])
+            # Product pages show the stock left
+            transaction.on_commit(catalog_cache.bump_version)
+    except OperationalError as e:
+        raise StockBusy from e
+    return expires_at
+
+
+def consume(cart):
+    """The cart's order was placed: its reserved stock is sold for good"""
+    StockReservation.objects.filter(cart=cart).delete()
+
+
+def release_expired(now=None, product_ids=None):
+    """Give back lapsed holds (of ``product_ids`` only, if given); returns how many were released"""
+    expired = StockReservation.objects.select_for_update(skip_locked=True).filter(expires_at__lte=now or timezone.now())
+    if product_ids is not None:
+        expired = expired.filter(product_id__in=product_ids)
+    with transaction.atomic():
+        expired = list(expired)
+        _release(expired)
+    return len(expired)
+
+
+def _release(reservations):
+    if not reservations:
+        return
+    deltas = Counter()
+    for reservation in reservations:
+        deltas[reservation.product_id] += reservation.quantity
+    _apply(deltas)
+    StockReservation.objects.filter(pk__in=[reservation.pk for reservation in reservations]).delete()
+    transaction.on_commit(catalog_cache.bump_version)
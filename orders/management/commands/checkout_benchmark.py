@@ -0,0 +1,92 @@
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from artists.models import Artist
+from cart.models import Cart, CartItem
+from orders import shipping
+from orders.models import Order
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Place orders from carts of growing size and check that checkout runs the same number '
+        'of queries whatever the number of lines. Works on a throwaway buyer and products, removed afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,2,5,10,25,50', help='Comma-separated cart sizes (lines)')
+
+    def handle(self, *args, **options):
+        artist = Artist.objects.first()
+        if artist is None:
+            raise CommandError('The benchmark needs at least one artist.')
+        sizes = [int(size) for size in options['sizes'].split(',')]
+
+        tag = f'checkout-benchmark-{uuid.uuid4().hex[:8]}'
+        buyer = get_user_model().objects.create_user(
+            username=tag, email=f'{tag}@example.com', role='customer', wilaya='algiers',
+        )
+        products = []
+        for i in range(max(sizes)):
+            product = Product(
+                artist=artist, name=f'{tag}-{i}', slug=f'{tag}-{i}', description=tag,
+                price=100 + i, stock=1000, available=False,
+            )
+            product.refresh_effective_price()
+            products.append(product)
+        products = Product.objects.bulk_create(products)
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver'], SECURE_SSL_REDIRECT=False):
+                self._run(buyer, products, sizes)
+        finally:
+            Order.objects.filter(user=buyer).delete()
+            Product.objects.filter(slug__startswith=tag).delete()
+            buyer.delete()
+
+    def _run(self, buyer, products, sizes):
+        client = Client()
+        client.force_login(buyer)
+        cart = Cart.objects.create(user=buyer)
+        url = reverse('orders:order_create')
+        form = {
+            'first_name': 'Bench', 'last_name': 'Mark', 'email': buyer.email, 'phone': '0550000000',
+            'address': '1 rue de test', 'wilaya': 'algiers', 'city': 'Alger',
+        }
+
+        # Warm the per-process caches the first page view fills
+        client.get(url)
+        shipping.rate_matrix()
+        counts = {}
+        for size in sizes:
+            CartItem.objects.bulk_create([CartItem(cart=cart, product=product, quantity=2) for product in products[:size]])
+            with CaptureQueriesContext(connection) as page:
+                client.get(url)
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as checkout:
+                response = client.post(url, form)
+            elapsed = time.perf_counter() - started
+            if response.status_code != 302:
+                raise CommandError(f'Checkout of {size} lines answered {response.status_code}')
+            order = Order.objects.filter(user=buyer).latest('created_at')
+            if order.items.count() != size or cart.items.exists():
+                raise CommandError(f'Checkout of {size} lines left {order.items.count()} order lines and a non-empty cart')
+
+            counts[size] = (len(page), len(checkout))
+            self.stdout.write(
+                f'{size:>3} lines: checkout page {len(page):>2} queries, '
+                f'placing the order {len(checkout):>2} queries in {elapsed * 1000:.1f} ms'
+            )
+
+        if len(set(counts.values())) > 1:
+            raise CommandError('The number of queries grows with the cart: ' + ', '.join(
+                f'{size} lines: {page}/{checkout}' for size, (page, checkout) in counts.items()
+            ))
+        self.stdout.write(self.style.SUCCESS('Checkout runs a constant number of queries.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from orders import inventory
+
+
+class Command(BaseCommand):
+    help = 'Give back the stock held by checkouts that were abandoned (run from cron every few minutes)'
+
+    def handle(self, *args, **options):
+        released = inventory.release_expired()
+        self.stdout.write(self.style.SUCCESS(f'{released} expired reservations released'))
@@ -0,0 +1,110 @@
+import statistics
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from artists.models import Artist
+from cart.models import Cart
+from orders import inventory
+from orders.models import StockReservation
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Race many carts for the last pieces of one product and check that stock is never oversold, '
+        'never left unsold while buyers are turned away busy, and that lock waits stay bounded. Works on a throwaway product and carts, removed afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stock', type=int, default=5, help='Pieces available')
+        parser.add_argument('--buyers', type=int, default=200, help='Simultaneous checkouts')
+        parser.add_argument('--quantity', type=int, default=1, help='Pieces each buyer wants')
+
+    def handle(self, *args, **options):
+        artist = Artist.objects.first()
+        if artist is None:
+            raise CommandError('The benchmark needs at least one artist.')
+        stock, buyers, quantity = options['stock'], options['buyers'], options['quantity']
+
+        tag = f'stock-benchmark-{uuid.uuid4().hex[:8]}'
+        product = Product.objects.create(
+            artist=artist, name=tag, slug=tag, description=tag, price=1, stock=stock, available=False,
+        )
+        carts = Cart.objects.bulk_create([Cart(session_id=f'{tag}-{i}') for i in range(buyers)])
+        try:
+            self._race(product, carts, stock, quantity)
+        finally:
+            product.delete()
+            Cart.objects.filter(session_id__startswith=tag).delete()
+
+    def _race(self, product, carts, stock, quantity):
+        barrier = threading.Barrier(len(carts))
+        outcomes, waits = [], []
+        lock = threading.Lock()
+
+        def buy(cart):
+            barrier.wait()
+            started = time.perf_counter()
+            try:
+                inventory.reserve(cart, {product.pk: quantity})
+                outcome = 'reserved'
+            except inventory.InsufficientStock:
+                outcome = 'sold out'
+            except inventory.StockBusy:
+                outcome = 'busy'
+            finally:
+                connection.close()
+            with lock:
+                outcomes.append(outcome)
+                waits.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=buy, args=(cart,)) for cart in carts]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        product.refresh_from_db()
+        held = sum(StockReservation.objects.filter(product=product).values_list('quantity', flat=True))
+        reserved = outcomes.count('reserved')
+        self.stdout.write(
+            f'{len(carts)} buyers in {elapsed:.2f}s: {reserved} reserved, '
+            f'{outcomes.count("sold out")} sold out, {outcomes.count("busy")} busy'
+        )
+        percentiles = statistics.quantiles(waits, n=100)
+        self.stdout.write(
+            f'latency p50 {percentiles[49] * 1000:.1f} ms, p95 {percentiles[94] * 1000:.1f} ms, '
+            f'max {max(waits) * 1000:.1f} ms'
+        )
+        self.stdout.write(f'stock left {product.stock}, held {held}')
+
+        failures = []
+        if product.stock + held != stock:
+            failures.append(f'stock left + held = {product.stock + held}, expected {stock}')
+        if held != reserved * quantity:
+            failures.append(f'{held} pieces held for {reserved} successful checkouts')
+        if reserved > stock // quantity:
+            failures.append(f'{reserved} checkouts succeeded for {stock // quantity} available')
+        busy = outcomes.count('busy')
+        if busy and product.stock >= quantity:
+            # Contention must not starve the sale: the busy buyers wanted pieces that stayed on the shelf
+            failures.append(f'{busy} checkouts gave up busy while {product.stock} pieces were left unsold')
+        if max(waits) > inventory.LOCK_TIMEOUT * 2:
+            failures.append(f'a checkout waited {max(waits):.1f}s')
+
+        # Lapsed holds come back
+        expiry = max(StockReservation.objects.filter(product=product).values_list('expires_at', flat=True), default=None)
+        inventory.release_expired(now=expiry, product_ids=[product.pk])
+        product.refresh_from_db()
+        if product.stock != stock:
+            failures.append(f'stock is {product.stock} after releasing expired holds, expected {stock}')
+
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('No oversell, no unsold stock; expired holds were released.'))
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0003_alter_cartitem_unique_together_and_more'),
+        ('orders', '0003_alter_order_wilaya'),
+        ('products', '0010_video_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='quantity')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='expires at')),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='cart.cart')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'stock reservation',
+                'verbose_name_plural': 'stock reservations',
+                'constraints': [models.UniqueConstraint(fields=('cart', 'product'), name='unique_cart_reservation')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:54
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_total_cost(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    money = DecimalField(max_digits=12, decimal_places=2)
+    totals = (
+        OrderItem.objects.filter(order=OuterRef('pk')).values('order')
+        .annotate(total=Sum(F('price') * F('quantity'), output_field=money)).values('total')
+    )
+    Order.objects.update(total_cost=Coalesce(Subquery(totals, output_field=money), 0, output_field=money))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='shipping_cost',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='shipping cost'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12, verbose_name='total cost'),
+        ),
+        migrations.RunPython(backfill_total_cost, migrations.RunPython.noop),
+    ]
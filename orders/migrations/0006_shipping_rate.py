@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:56
+
+from django.db import migrations, models
+
+# The flat per-destination prices checkout used before rates were data
+DEFAULT_PRICES = {
+    'adrar': 500, 'chlef': 600, 'laghouat': 700, 'oum-el-bouaghi': 800, 'batna': 900, 'bejaia': 1000,
+    'biskra': 1100, 'bechar': 1200, 'blida': 1300, 'bouira': 1400, 'tamanrasset': 1500, 'tebessa': 1600,
+    'tlemcen': 1700, 'tiaret': 1800, 'tizi-ouzou': 1900, 'algiers': 2000, 'djelfa': 2100, 'jijel': 2200,
+    'setif': 2300, 'saida': 2400, 'skikda': 2500, 'sidi-bel-abbes': 2600, 'annaba': 2700, 'guelma': 2800,
+    'constantine': 2900, 'medea': 3000, 'mostaganem': 3100, 'msila': 3200, 'mascara': 3300, 'ouargla': 3400,
+    'oran': 3500, 'el-bayadh': 3600, 'illizi': 3700, 'bordj-bou-arreridj': 3800, 'boumerdes': 3900,
+    'el-tarf': 4000, 'tindouf': 4100, 'tissemsilt': 4200, 'el-oued': 4300, 'khenchela': 4400, 'souk-ahras': 4500,
+    'tipaza': 4600, 'mila': 4700, 'ain-defla': 4800, 'naama': 4900, 'ain-temouchent': 5000, 'ghardaia': 5100,
+    'relizane': 5200, 'timimoun': 5300, 'bordj-badji-mokhtar': 5400, 'ouled-djellal': 5500, 'beni-abbes': 5600,
+    'in-salah': 5700, 'in-guezzam': 5800, 'touggourt': 5900, 'djanet': 6000, 'el-mghair': 6100, 'el-menia': 6200,
+}
+
+
+def seed_default_rates(apps, schema_editor):
+    ShippingRate = apps.get_model('orders', 'ShippingRate')
+    ShippingRate.objects.bulk_create([
+        ShippingRate(agency='', origin_wilaya='', destination_wilaya=destination, price=price)
+        for destination, price in DEFAULT_PRICES.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_stored_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShippingRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('agency', models.CharField(blank=True, help_text='Leave blank for the rate of any agency.', max_length=100, verbose_name='delivery agency')),
+                ('origin_wilaya', models.CharField(blank=True, choices=[('adrar', 'Adrar'), ('chlef', 'Chlef'), ('laghouat', 'Laghouat'), ('oum-el-bouaghi', 'Oum El Bouaghi'), ('batna', 'Batna'), ('bejaia', 'Béjaïa'), ('biskra', 'Biskra'), ('bechar', 'Béchar'), ('blida', 'Blida'), ('bouira', 'Bouira'), ('tamanrasset', 'Tamanrasset'), ('tebessa', 'Tébessa'), ('tlemcen', 'Tlemcen'), ('tiaret', 'Tiaret'), ('tizi-ouzou', 'Tizi Ouzou'), ('algiers', 'Algiers'), ('djelfa', 'Djelfa'), ('jijel', 'Jijel'), ('setif', 'Sétif'), ('saida', 'Saïda'), ('skikda', 'Skikda'), ('sidi-bel-abbes', 'Sidi Bel Abbès'), ('annaba', 'Annaba'), ('guelma', 'Guelma'), ('constantine', 'Constantine'), ('medea', 'Médéa'), ('mostaganem', 'Mostaganem'), ('msila', "M'Sila"), ('mascara', 'Mascara'), ('ouargla', 'Ouargla'), ('oran', 'Oran'), ('el-bayadh', 'El Bayadh'), ('illizi', 'Illizi'), ('bordj-bou-arreridj', 'Bordj Bou Arréridj'), ('boumerdes', 'Boumerdès'), ('el-tarf', 'El Tarf'), ('tindouf', 'Tindouf'), ('tissemsilt', 'Tissemsilt'), ('el-oued', 'El Oued'), ('khenchela', 'Khenchela'), ('souk-ahras', 'Souk Ahras'), ('tipaza', 'Tipaza'), ('mila', 'Mila'), ('ain-defla', 'Aïn Defla'), ('naama', 'Naâma'), ('ain-temouchent', 'Aïn Témouchent'), ('ghardaia', 'Ghardaïa'), ('relizane', 'Relizane'), ('timimoun', 'Timimoun'), ('bordj-badji-mokhtar', 'Bordj Badji Mokhtar'), ('ouled-djellal', 'Ouled Djellal'), ('beni-abbes', 'Béni Abbès'), ('in-salah', 'In Salah'), ('in-guezzam', 'In Guezzam'), ('touggourt', 'Touggourt'), ('djanet', 'Djanet'), ('el-mghair', "El M'Ghair"), ('el-menia', 'El Menia')], help_text='Leave blank for the rate from anywhere.', max_length=100, verbose_name='from')),
+                ('destination_wilaya', models.CharField(choices=[('adrar', 'Adrar'), ('chlef', 'Chlef'), ('laghouat', 'Laghouat'), ('oum-el-bouaghi', 'Oum El Bouaghi'), ('batna', 'Batna'), ('bejaia', 'Béjaïa'), ('biskra', 'Biskra'), ('bechar', 'Béchar'), ('blida', 'Blida'), ('bouira', 'Bouira'), ('tamanrasset', 'Tamanrasset'), ('tebessa', 'Tébessa'), ('tlemcen', 'Tlemcen'), ('tiaret', 'Tiaret'), ('tizi-ouzou', 'Tizi Ouzou'), ('algiers', 'Algiers'), ('djelfa', 'Djelfa'), ('jijel', 'Jijel'), ('setif', 'Sétif'), ('saida', 'Saïda'), ('skikda', 'Skikda'), ('sidi-bel-abbes', 'Sidi Bel Abbès'), ('annaba', 'Annaba'), ('guelma', 'Guelma'), ('constantine', 'Constantine'), ('medea', 'Médéa'), ('mostaganem', 'Mostaganem'), ('msila', "M'Sila"), ('mascara', 'Mascara'), ('ouargla', 'Ouargla'), ('oran', 'Oran'), ('el-bayadh', 'El Bayadh'), ('illizi', 'Illizi'), ('bordj-bou-arreridj', 'Bordj Bou Arréridj'), ('boumerdes', 'Boumerdès'), ('el-tarf', 'El Tarf'), ('tindouf', 'Tindouf'), ('tissemsilt', 'Tissemsilt'), ('el-oued', 'El Oued'), ('khenchela', 'Khenchela'), ('souk-ahras', 'Souk Ahras'), ('tipaza', 'Tipaza'), ('mila', 'Mila'), ('ain-defla', 'Aïn Defla'), ('naama', 'Naâma'), ('ain-temouchent', 'Aïn Témouchent'), ('ghardaia', 'Ghardaïa'), ('relizane', 'Relizane'), ('timimoun', 'Timimoun'), ('bordj-badji-mokhtar', 'Bordj Badji Mokhtar'), ('ouled-djellal', 'Ouled Djellal'), ('beni-abbes', 'Béni Abbès'), ('in-salah', 'In Salah'), ('in-guezzam', 'In Guezzam'), ('touggourt', 'Touggourt'), ('djanet', 'Djanet'), ('el-mghair', "El M'Ghair"), ('el-menia', 'El Menia')], max_length=100, verbose_name='to')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='price')),
+            ],
+            options={
+                'verbose_name': 'shipping rate',
+                'verbose_name_plural': 'shipping rates',
+                'ordering': ['agency', 'origin_wilaya', 'destination_wilaya'],
+                'constraints': [models.UniqueConstraint(fields=('agency', 'origin_wilaya', 'destination_wilaya'), name='unique_shipping_rate')],
+            },
+        ),
+        migrations.RunPython(seed_default_rates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import DecimalField, F, Sum
+
+
+def backfill_artist_orders(apps, schema_editor):
+    """One part per (order, artist) of the existing lines, with the order's status and date"""
+    ArtistOrder = apps.get_model('orders', 'ArtistOrder')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    parts = (
+        OrderItem.objects.values('order', 'product__artist', 'order__status', 'order__created_at')
+        .annotate(subtotal=Sum(F('price') * F('quantity'), output_field=DecimalField(max_digits=12, decimal_places=2)))
+        .order_by()
+    )
+    ArtistOrder.objects.bulk_create([
+        ArtistOrder(
+            order_id=part['order'], artist_id=part['product__artist'], subtotal=part['subtotal'],
+            status=part['order__status'], created_at=part['order__created_at'],
+        )
+        for part in parts.iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0002_initial'),
+        ('orders', '0006_shipping_rate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArtistOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='subtotal')),
+                ('shipping_cost', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='shipping cost')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], default='pending', max_length=10, verbose_name='status')),
+                ('created_at', models.DateTimeField(verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('artist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders', to='artists.artist')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='artist_orders', to='orders.order')),
+            ],
+            options={
+                'verbose_name': 'artist order',
+                'verbose_name_plural': 'artist orders',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['artist', 'status', '-created_at'], name='artist_order_status_idx'), models.Index(fields=['artist', '-created_at'], name='artist_order_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('order', 'artist'), name='unique_artist_order')],
+            },
+        ),
+        migrations.RunPython(backfill_artist_orders, migrations.RunPython.noop),
+    ]
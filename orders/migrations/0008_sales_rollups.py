@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0002_initial'),
+        ('orders', '0007_artist_order'),
+        ('products', '0012_product_effective_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyWilayaSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='day')),
+                ('wilaya', models.CharField(choices=[('adrar', 'Adrar'), ('chlef', 'Chlef'), ('laghouat', 'Laghouat'), ('oum-el-bouaghi', 'Oum El Bouaghi'), ('batna', 'Batna'), ('bejaia', 'Béjaïa'), ('biskra', 'Biskra'), ('bechar', 'Béchar'), ('blida', 'Blida'), ('bouira', 'Bouira'), ('tamanrasset', 'Tamanrasset'), ('tebessa', 'Tébessa'), ('tlemcen', 'Tlemcen'), ('tiaret', 'Tiaret'), ('tizi-ouzou', 'Tizi Ouzou'), ('algiers', 'Algiers'), ('djelfa', 'Djelfa'), ('jijel', 'Jijel'), ('setif', 'Sétif'), ('saida', 'Saïda'), ('skikda', 'Skikda'), ('sidi-bel-abbes', 'Sidi Bel Abbès'), ('annaba', 'Annaba'), ('guelma', 'Guelma'), ('constantine', 'Constantine'), ('medea', 'Médéa'), ('mostaganem', 'Mostaganem'), ('msila', "M'Sila"), ('mascara', 'Mascara'), ('ouargla', 'Ouargla'), ('oran', 'Oran'), ('el-bayadh', 'El Bayadh'), ('illizi', 'Illizi'), ('bordj-bou-arreridj', 'Bordj Bou Arréridj'), ('boumerdes', 'Boumerdès'), ('el-tarf', 'El Tarf'), ('tindouf', 'Tindouf'), ('tissemsilt', 'Tissemsilt'), ('el-oued', 'El Oued'), ('khenchela', 'Khenchela'), ('souk-ahras', 'Souk Ahras'), ('tipaza', 'Tipaza'), ('mila', 'Mila'), ('ain-defla', 'Aïn Defla'), ('naama', 'Naâma'), ('ain-temouchent', 'Aïn Témouchent'), ('ghardaia', 'Ghardaïa'), ('relizane', 'Relizane'), ('timimoun', 'Timimoun'), ('bordj-badji-mokhtar', 'Bordj Badji Mokhtar'), ('ouled-djellal', 'Ouled Djellal'), ('beni-abbes', 'Béni Abbès'), ('in-salah', 'In Salah'), ('in-guezzam', 'In Guezzam'), ('touggourt', 'Touggourt'), ('djanet', 'Djanet'), ('el-mghair', "El M'Ghair"), ('el-menia', 'El Menia')], max_length=100, verbose_name='wilaya/region')),
+                ('orders', models.IntegerField(default=0, verbose_name='orders')),
+                ('quantity', models.IntegerField(default=0, verbose_name='quantity')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='revenue')),
+            ],
+            options={
+                'verbose_name': 'daily wilaya sales',
+                'verbose_name_plural': 'daily wilaya sales',
+                'ordering': ['-day', 'wilaya'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'wilaya'), name='unique_daily_wilaya_sales')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='day')),
+                ('orders', models.IntegerField(default=0, verbose_name='orders')),
+                ('quantity', models.IntegerField(default=0, verbose_name='quantity')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='revenue')),
+                ('artist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='artists.artist')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'daily product sales',
+                'verbose_name_plural': 'daily product sales',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['artist', 'day'], name='daily_sales_artist_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'artist', 'product'), name='unique_daily_product_sales')],
+            },
+        ),
+    ]
@@ -1,7 +1,12 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Sum
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from products.models import Product
+from .shipping import normalize_agency
+
+def _line_total(prefix=''):
+    return Sum(F(f'{prefix}price') * F(f'{prefix}quantity'), output_field=models.DecimalField(max_digits=12, decimal_places=2))
 
 # Create your models here.
 class Order(models.Model):
@@ -12,6 +17,7 @@ class Order(models.Model):
         ('delivered', _('Delivered')),
         ('cancelled', _('Cancelled')),
     )
+    STATUS_FLOW = ['pending', 'processing', 'shipped', 'delivered']
     
     WILAYA_CHOICES = (
         ('adrar', _('Adrar')),
@@ -88,6 +94,9 @@ class Order(models.Model):
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
     paid = models.BooleanField(_('paid'), default=False)
+    # Computed at checkout so order lists don't sum the lines
+    total_cost = models.DecimalField(_('total cost'), max_digits=12, decimal_places=2, default=0, editable=False)
+    shipping_cost = models.DecimalField(_('shipping cost'), max_digits=10, decimal_places=2, default=0)
     
     class Meta:
         verbose_name = _('order')
@@ -98,7 +107,53 @@ class Order(models.Model):
         return f'Order {self.id}'
     
     def get_total_cost(self):
-        return sum(item.get_cost() for item in self.items.all())
+        return self.total_cost
+    
+    def get_total_with_shipping(self):
+        return self.total_cost + self.shipping_cost
+    
+    def refresh_total_cost(self):
+        """Recompute the stored total after the lines were edited (e.g. in the admin)"""
+        self.total_cost = self.items.aggregate(total=_line_total())['total'] or 0
+        self.save(update_fields=['total_cost', 'updated_at'])
+    
+    def refresh_artist_orders(self):
+        """
+        Recompute each artist's part from the lines after they were edited:
+        new artists get a part, emptied parts are dropped.
+        """
+        from . import stats
+        subtotals = dict(
+            self.items.order_by().values('product__artist').annotate(subtotal=_line_total()).values_list('product__artist', 'subtotal')
+        )
+        parts = {part.artist_id: part for part in self.artist_orders.all()}
+        changed = [part for artist_id, part in parts.items() if artist_id in subtotals and part.subtotal != subtotals[artist_id]]
+        for part in changed:
+            part.subtotal = subtotals[part.artist_id]
+        ArtistOrder.objects.bulk_update(changed, ['subtotal'])
+        added = ArtistOrder.objects.bulk_create([
+            ArtistOrder(order=self, artist_id=artist_id, subtotal=subtotal, status=self.status, created_at=self.created_at)
+            for artist_id, subtotal in subtotals.items() if artist_id not in parts
+        ])
+        # Deleting sends signals; the bulk insert doesn't
+        self.artist_orders.exclude(artist_id__in=list(subtotals)).delete()
+        if added:
+            artist_ids = [part.artist_id for part in added]
+            transaction.on_commit(lambda: stats.forget(*artist_ids))
+    
+    def refresh_status(self):
+        """
+        Follow the artists' parts: the order is as far along as its slowest
+        part that isn't cancelled, and cancelled once every part is.
+        """
+        statuses = set(self.artist_orders.values_list('status', flat=True))
+        if not statuses:
+            return
+        active = statuses - {'cancelled'}
+        status = min(active, key=self.STATUS_FLOW.index) if active else 'cancelled'
+        if status != self.status:
+            self.status = status
+            self.save(update_fields=['status', 'updated_at'])
     
     def get_absolute_url(self):
         from django.urls import reverse
@@ -119,3 +174,116 @@ class OrderItem(models.Model):
     
     def get_cost(self):
         return self.price * self.quantity
+
+class ArtistOrder(models.Model):
+    """
+    One artist's part of an order, written at checkout: what the artist
+    sells in it, the parcel's shipping and its own fulfilment status.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='artist_orders')
+    artist = models.ForeignKey('artists.Artist', on_delete=models.CASCADE, related_name='orders')
+    subtotal = models.DecimalField(_('subtotal'), max_digits=12, decimal_places=2)
+    shipping_cost = models.DecimalField(_('shipping cost'), max_digits=10, decimal_places=2, default=0)
+    status = models.CharField(_('status'), max_length=10, choices=Order.STATUS_CHOICES, default='pending')
+    # The order's date, copied so the artist's list is one index range scan
+    created_at = models.DateTimeField(_('created at'))
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('artist order')
+        verbose_name_plural = _('artist orders')
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'artist'], name='unique_artist_order')
+        ]
+        indexes = [
+            models.Index(fields=['artist', 'status', '-created_at'], name='artist_order_status_idx'),
+            models.Index(fields=['artist', '-created_at'], name='artist_order_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f'Order {self.order_id} for {self.artist_id}'
+    
+    def get_total_with_shipping(self):
+        return self.subtotal + self.shipping_cost
+
+class StockReservation(models.Model):
+    """Stock taken off a product while its cart goes through checkout"""
+    cart = models.ForeignKey('cart.Cart', on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField(_('quantity'))
+    expires_at = models.DateTimeField(_('expires at'), db_index=True)
+    
+    class Meta:
+        verbose_name = _('stock reservation')
+        verbose_name_plural = _('stock reservations')
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_reservation')
+        ]
+    
+    def __str__(self):
+        return f'{self.quantity}x {self.product_id} for cart {self.cart_id}'
+
+class ShippingRate(models.Model):
+    """Price of one parcel from an agency, origin wilaya to destination wilaya (see orders.shipping)"""
+    agency = models.CharField(_('delivery agency'), max_length=100, blank=True, help_text=_('Leave blank for the rate of any agency.'))
+    origin_wilaya = models.CharField(_('from'), max_length=100, choices=Order.WILAYA_CHOICES, blank=True, help_text=_('Leave blank for the rate from anywhere.'))
+    destination_wilaya = models.CharField(_('to'), max_length=100, choices=Order.WILAYA_CHOICES)
+    price = models.DecimalField(_('price'), max_digits=10, decimal_places=2)
+    
+    class Meta:
+        verbose_name = _('shipping rate')
+        verbose_name_plural = _('shipping rates')
+        ordering = ['agency', 'origin_wilaya', 'destination_wilaya']
+        constraints = [
+            models.UniqueConstraint(fields=['agency', 'origin_wilaya', 'destination_wilaya'], name='unique_shipping_rate')
+        ]
+    
+    def __str__(self):
+        return f'{self.agency or "*"}: {self.origin_wilaya or "*"} -> {self.destination_wilaya} ({self.price})'
+    
+    def save(self, *args, **kwargs):
+        self.agency = normalize_agency(self.agency)
+        super().save(*args, **kwargs)
+
+class DailyProductSales(models.Model):
+    """What an artist sold of one product in a day, kept up to date by orders.rollups"""
+    day = models.DateField(_('day'))
+    artist = models.ForeignKey('artists.Artist', on_delete=models.CASCADE, related_name='daily_sales')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    orders = models.IntegerField(_('orders'), default=0)
+    quantity = models.IntegerField(_('quantity'), default=0)
+    revenue = models.DecimalField(_('revenue'), max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name = _('daily product sales')
+        verbose_name_plural = _('daily product sales')
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'artist', 'product'], name='unique_daily_product_sales')
+        ]
+        indexes = [
+            models.Index(fields=['artist', 'day'], name='daily_sales_artist_day_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.day} {self.product_id}: {self.quantity}'
+
+class DailyWilayaSales(models.Model):
+    """Orders shipped to one wilaya in a day, kept up to date by orders.rollups"""
+    day = models.DateField(_('day'))
+    wilaya = models.CharField(_('wilaya/region'), max_length=100, choices=Order.WILAYA_CHOICES)
+    orders = models.IntegerField(_('orders'), default=0)
+    quantity = models.IntegerField(_('quantity'), default=0)
+    revenue = models.DecimalField(_('revenue'), max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name = _('daily wilaya sales')
+        verbose_name_plural = _('daily wilaya sales')
+        ordering = ['-day', 'wilaya']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'wilaya'], name='unique_daily_wilaya_sales')
+        ]
+    
+    def __str__(self):
+        return f'{self.day} {self.wilaya}: {self.revenue}'
@@ -0,0 +1,121 @@
+"""
+Daily sales rollups.
+
+Sales analytics read two small tables instead of the order lines:
+
+- ``DailyProductSales``: day x artist x product
+- ``DailyWilayaSales``: day x destination wilaya
+
+A line counts towards the day its order was placed, unless the artist's
+part of the order is cancelled. The tables follow the orders by adding or
+subtracting an order's contribution whenever it changes: at checkout
+(``record``), around status changes and admin edits (``subtract`` the old
+state, then ``add`` the new one) and when an order is deleted (see
+``orders.signals``). Rows that fall back to no orders are deleted.
+``build_sales_rollups`` rebuilds them from history.
+
+Each change is one multi-row INSERT ... ON CONFLICT DO UPDATE SET
+x = x + excluded.x per table, so concurrent checkouts add up instead of
+racing on the unique day keys.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection
+from django.utils import timezone
+
+# Rows per statement, well below SQLite's limit on query parameters
+BATCH_SIZE = 500
+
+
+def _totals():
+    return [set(), 0, Decimal('0.00')]
+
+
+def _contributions(lines):
+    """
+    Rollup rows for ``lines`` of (order id, placed at, wilaya, artist id,
+    product id, price, quantity): {key: [order ids, quantity, revenue]}
+    for each table.
+    """
+    products = defaultdict(_totals)
+    wilayas = defaultdict(_totals)
+    for order_id, created_at, wilaya, artist_id, product_id, price, quantity in lines:
+        day = timezone.localdate(created_at)
+        for row in (products[day, artist_id, product_id], wilayas[day, wilaya]):
+            row[0].add(order_id)
+            row[1] += quantity
+            row[2] += price * quantity
+    return products, wilayas
+
+
+def _increment(model, key_columns, rows, sign):
+    """Add ``sign`` times ``rows`` to ``model``'s counters, inserting the missing rows"""
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = [*key_columns, 'orders', 'quantity', 'revenue']
+    counters = [qn(column) for column in columns[len(key_columns):]]
+    if connection.vendor == 'mysql':
+        conflict = 'ON DUPLICATE KEY UPDATE ' + ', '.join(f'{c} = {c} + VALUES({c})' for c in counters)
+    else:
+        # PostgreSQL, SQLite 3.24+
+        conflict = (
+            f'ON CONFLICT ({", ".join(qn(column) for column in key_columns)}) DO UPDATE SET '
+            + ', '.join(f'{c} = {table}.{c} + excluded.{c}' for c in counters)
+        )
+    row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+    rows = list(rows.items())
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            params = []
+            for (day, *key), (order_ids, quantity, revenue) in batch:
+                params += [connection.ops.adapt_datefield_value(day), *key, sign * len(order_ids), sign * quantity, sign * revenue]
+            cursor.execute(
+                f'INSERT INTO {table} ({", ".join(map(qn, columns))}) VALUES {", ".join([row_sql] * len(batch))} {conflict}',
+                params,
+            )
+
+
+def _apply(lines, sign):
+    from .models import DailyProductSales, DailyWilayaSales
+    products, wilayas = _contributions(lines)
+    _increment(DailyProductSales, ['day', 'artist_id', 'product_id'], products, sign)
+    _increment(DailyWilayaSales, ['day', 'wilaya'], wilayas, sign)
+    if sign < 0:
+        # Rows left with no orders would be reported as 0 DA sales; a rebuild has none
+        if products:
+            DailyProductSales.objects.filter(
+                day__in={day for day, artist_id, product_id in products},
+                product_id__in={product_id for day, artist_id, product_id in products},
+                orders__lte=0,
+            ).delete()
+        if wilayas:
+            DailyWilayaSales.objects.filter(day__in={day for day, wilaya in wilayas}, orders__lte=0).delete()
+
+
+def _lines(order_ids):
+    """The counted lines of these orders as they stand in the database"""
+    from .models import ArtistOrder, OrderItem
+    cancelled = set(
+        ArtistOrder.objects.filter(order_id__in=order_ids, status='cancelled').values_list('order_id', 'artist_id')
+    )
+    lines = OrderItem.objects.filter(order_id__in=order_ids).values_list(
+        'order_id', 'order__created_at', 'order__wilaya', 'product__artist_id', 'product_id', 'price', 'quantity',
+    )
+    return [line for line in lines if (line[0], line[3]) not in cancelled]
+
+
+def add(order_ids):
+    """Count these orders as they stand"""
+    _apply(_lines(order_ids), 1)
+
+
+def subtract(order_ids):
+    """Stop counting these orders as they stand, e.g. before changing them"""
+    _apply(_lines(order_ids), -1)
+
+
+def record(order, lines):
+    """Count a new order from its (artist id, product id, price, quantity) lines, without reading them back"""
+    _apply([(order.pk, order.created_at, order.wilaya, *line) for line in lines], 1)
@@ -0,0 +1,107 @@
+"""
+Shipping rates and quotes.
+
+A ``ShippingRate`` prices one parcel sent by a delivery agency from the
+artist's wilaya to the buyer's. Rows with a blank agency or origin are
+defaults; a quote uses the most specific rate that exists:
+
+    (agency, origin, destination) > (agency, any origin, destination)
+    > (any agency, origin, destination) > (any agency, any origin, destination)
+
+The table is small and read on every checkout, so each process keeps it as
+a dict and reloads it only when the shared version counter moves (saving or
+deleting a rate bumps it, see ``orders.signals``).
+
+A cart ships as one parcel per artist, so shipping is charged per artist
+rather than per line. Artists without a delivery agency arrange delivery
+themselves and charge nothing here.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+
+VERSION_KEY = 'shipping:rates-version'
+
+_loaded = {'version': None, 'rates': {}}
+
+
+def normalize_agency(name):
+    """Agency names are free text: compare them case- and spacing-insensitively"""
+    return ' '.join((name or '').split()).casefold()
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        # Still None on a cache that keeps nothing
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Make every process reload the rates"""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            pass  # a cache that keeps nothing (DummyCache): every quote reloads anyway
+
+
+def rate_matrix():
+    """{(agency, origin, destination): price} for every rate, kept in process"""
+    version = get_version()
+    if version is None or _loaded['version'] != version:
+        from .models import ShippingRate
+        _loaded['rates'] = {
+            (agency, origin, destination): price
+            for agency, origin, destination, price in ShippingRate.objects.values_list(
+                'agency', 'origin_wilaya', 'destination_wilaya', 'price',
+            )
+        }
+        _loaded['version'] = version
+    return _loaded['rates']
+
+
+def get_rate(agency, origin, destination):
+    """Price of a parcel, or None if no rate covers the trip"""
+    rates = rate_matrix()
+    agency = normalize_agency(agency)
+    for key in ((agency, origin, destination), (agency, '', destination), ('', origin, destination), ('', '', destination)):
+        if key in rates:
+            return rates[key]
+    return None
+
+
+def quote(items, destination):
+    """
+    Group cart lines (loaded with ``product__artist__user``) into one parcel
+    per artist and price each for ``destination``, in one pass. Returns the
+    parcels, in the order their artists first appear, and the shipping total.
+    """
+    parcels = {}
+    for item in items:
+        artist = item.product.artist
+        parcel = parcels.get(artist.pk)
+        if parcel is None:
+            user = artist.user
+            parcel = parcels[artist.pk] = {
+                'artist': artist,
+                'agency': user.delivery_agency if user.role == 'artist' else None,
+                'origin': user.wilaya,
+                'items': [],
+                'subtotal': Decimal('0.00'),
+                'shipping_price': Decimal('0.00'),
+            }
+        parcel['items'].append(item)
+        parcel['subtotal'] += item.get_cost()
+
+    shipping_total = Decimal('0.00')
+    for parcel in parcels.values():
+        if parcel['agency'] and destination:
+            parcel['shipping_price'] = get_rate(parcel['agency'], parcel['origin'], destination) or Decimal('0.00')
+        shipping_total += parcel['shipping_price']
+    return list(parcels.values()), shipping_total
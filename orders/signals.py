@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import rollups, shipping, stats
+from .models import ArtistOrder, Order, ShippingRate
+
+
+@receiver([post_save, post_delete], sender=ShippingRate)
+def reload_shipping_rates(sender, **kwargs):
+    """Every process reloads its rate matrix on its next quote"""
+    transaction.on_commit(shipping.bump_version)
+
+
+@receiver([post_save, post_delete], sender=ArtistOrder)
+def forget_artist_stats(sender, instance, **kwargs):
+    """The artist's dashboard counts changed"""
+    transaction.on_commit(lambda: stats.forget(instance.artist_id))
+
+
+@receiver(pre_delete, sender=Order)
+def uncount_deleted_order(sender, instance, **kwargs):
+    """Take the order out of the sales rollups while its lines can still be read"""
+    rollups.subtract([instance.pk])
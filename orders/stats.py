@@ -0,0 +1,40 @@
+"""
+Order counts per status for an artist's dashboard.
+
+The counts come from one conditional aggregation over the artist's
+``ArtistOrder`` rows and are cached per artist. Anything that adds, removes
+or changes the status of an artist's part forgets that artist's entry:
+saves and deletes through ``orders.signals``, and the bulk writes of
+checkout and the admin by calling ``forget`` themselves.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+DEFAULT_TIMEOUT = 10 * 60
+
+
+def make_key(artist_id):
+    return f'orders:artist-stats:{artist_id}'
+
+
+def compute(artist_id):
+    """{'total': n, '<status>': n, ...} in a single query"""
+    from .models import ArtistOrder, Order
+    return ArtistOrder.objects.filter(artist_id=artist_id).aggregate(
+        total=Count('pk'),
+        **{status: Count('pk', filter=Q(status=status)) for status, label in Order.STATUS_CHOICES},
+    )
+
+
+def artist_order_stats(artist_id, timeout=DEFAULT_TIMEOUT):
+    key = make_key(artist_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute(artist_id)
+        cache.set(key, stats, timeout)
+    return stats
+
+
+def forget(*artist_ids):
+    """Drop the cached counts of these artists"""
+    cache.delete_many([make_key(artist_id) for artist_id in artist_ids])
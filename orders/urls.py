@@ -5,11 +5,14 @@ app_name = 'orders'
 
 urlpatterns = [
     path('create/', views.order_create, name='order_create'),
+    path('shipping-quote/', views.shipping_quote, name='shipping_quote'),
     path('detail/<int:pk>/', views.order_detail, name='order_detail'),
     path('history/', views.order_history, name='order_history'),
     
     # Artist order management
     path('artist/', views.artist_orders, name='artist_orders'),
+    path('artist/stats/', views.artist_order_stats, name='artist_order_stats'),
+    path('artist/sales/', views.artist_sales, name='artist_sales'),
     path('artist/detail/<int:pk>/', views.artist_order_detail, name='artist_order_detail'),
     path('artist/update-status/<int:pk>/', views.update_order_status, name='update_order_status'),
 ]
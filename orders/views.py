@@ -2,72 +2,109 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
-from django.db.models import Q, Count, Sum
+from django.db import transaction
+from django.db.models import Q, Count, Sum, Prefetch
 from django.http import JsonResponse
+from django.utils import timezone
+from datetime import timedelta
 import json
 
-from .models import Order, OrderItem
+from . import inventory, rollups, shipping, stats
+from .models import ArtistOrder, Order, OrderItem
 from .forms import OrderCreateForm
-from cart.models import Cart
-from cart.views import _get_cart
+from cart.utils import get_cart, remember_count
 from artists.models import Artist
 from products.models import Product
 
+def _stock_error(request, items, error):
+    if isinstance(error, inventory.StockBusy):
+        messages.error(request, _('Many people are checking out the same items right now. Please try again in a moment.'))
+        return redirect('cart:cart_detail')
+    product = next(item.product for item in items if item.product_id == error.product_id)
+    if error.available:
+        messages.error(request, _('Only %(count)s of "%(product)s" left. Please update your cart.') % {'count': error.available, 'product': product.name})
+    else:
+        messages.error(request, _('"%(product)s" has just sold out. Please remove it from your cart.') % {'product': product.name})
+    return redirect('cart:cart_detail')
+
+def _checkout_items(cart):
+    """Every line with its product, artist and the artist's user, in one query"""
+    return list(cart.items.with_card_data().select_related('product__artist__user'))
+
+def _place_order(form, user, cart, items, parcels, shipping_total):
+    """
+    Turn the cart into an order in one transaction: renew the stock hold,
+    save the order with its totals, bulk insert the lines and each artist's
+    part, and empty the cart. Runs the same number of queries whatever the
+    size of the cart.
+    """
+    quantities = {item.product_id: item.quantity for item in items}
+    with transaction.atomic():
+        # Renews the hold taken when the page was opened, or takes it
+        # again if it lapsed; nothing is written when stock ran out
+        inventory.reserve(cart, quantities)
+        # Prices as of now, while the held product rows are locked
+        prices = dict(Product.objects.filter(pk__in=list(quantities)).values_list('pk', 'effective_price'))
+        order = form.save(commit=False)
+        order.user = user
+        order.total_cost = sum(prices[product_id] * quantity for product_id, quantity in quantities.items())
+        order.shipping_cost = shipping_total
+        order.save()
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=product_id, price=prices[product_id], quantity=quantity)
+            for product_id, quantity in quantities.items()
+        ])
+        ArtistOrder.objects.bulk_create([
+            ArtistOrder(
+                order=order, artist=parcel['artist'], shipping_cost=parcel['shipping_price'], created_at=order.created_at,
+                subtotal=sum(prices[item.product_id] * item.quantity for item in parcel['items']),
+            )
+            for parcel in parcels
+        ])
+        artist_ids = [parcel['artist'].pk for parcel in parcels]
+        transaction.on_commit(lambda: stats.forget(*artist_ids))
+        inventory.consume(cart)
+        cart.clear()
+        # Last, so the busy per-day rollup rows stay locked only until commit
+        rollups.record(order, [
+            (item.product.artist_id, item.product_id, prices[item.product_id], item.quantity) for item in items
+        ])
+    return order
+
 # Create your views here.
 @login_required
 def order_create(request):
-    cart = _get_cart(request)
-    wilaya_shipping_prices = {
-        'adrar': 500, 'chlef': 600, 'laghouat': 700, 'oum-el-bouaghi': 800, 'batna': 900, 'bejaia': 1000,
-        'biskra': 1100, 'bechar': 1200, 'blida': 1300, 'bouira': 1400, 'tamanrasset': 1500, 'tebessa': 1600,
-        'tlemcen': 1700, 'tiaret': 1800, 'tizi-ouzou': 1900, 'algiers': 2000, 'djelfa': 2100, 'jijel': 2200,
-        'setif': 2300, 'saida': 2400, 'skikda': 2500, 'sidi-bel-abbes': 2600, 'annaba': 2700, 'guelma': 2800,
-        'constantine': 2900, 'medea': 3000, 'mostaganem': 3100, 'msila': 3200, 'mascara': 3300, 'ouargla': 3400,
-        'oran': 3500, 'el-bayadh': 3600, 'illizi': 3700, 'bordj-bou-arreridj': 3800, 'boumerdes': 3900,
-        'el-tarf': 4000, 'tindouf': 4100, 'tissemsilt': 4200, 'el-oued': 4300, 'khenchela': 4400, 'souk-ahras': 4500,
-        'tipaza': 4600, 'mila': 4700, 'ain-defla': 4800, 'naama': 4900, 'ain-temouchent': 5000, 'ghardaia': 5100,
-        'relizane': 5200, 'timimoun': 5300, 'bordj-badji-mokhtar': 5400, 'ouled-djellal': 5500, 'beni-abbes': 5600,
-        'in-salah': 5700, 'in-guezzam': 5800, 'touggourt': 5900, 'djanet': 6000, 'el-mghair': 6100, 'el-menia': 6200,
-    }
-    shipping_details = []
-    shipping_total = 0
-    customer_wilaya = request.user.wilaya if request.user.is_authenticated else None
-    if cart.items.exists() and customer_wilaya:
-        for item in cart.items.all():
-            artist = getattr(item.product.artist, 'user', None)
-            agency = artist.delivery_agency if artist and artist.role == 'artist' else None
-            wilaya = customer_wilaya
-            shipping_price = wilaya_shipping_prices.get(wilaya, 0) if agency else 0
-            shipping_details.append({
-                'item': item,
-                'agency': agency,
-                'shipping_price': shipping_price,
-            })
-            shipping_total += shipping_price
+    cart = get_cart(request)
+    items = _checkout_items(cart)
+    subtotal = sum(item.get_cost() for item in items)
+    wilaya = request.POST.get('wilaya') if request.method == 'POST' else request.user.wilaya
+    parcels, shipping_total = shipping.quote(items, wilaya)
     context = {
         'form': None,
         'cart': cart,
-        'shipping_details': shipping_details,
+        'items': items,
+        'subtotal': subtotal,
+        'parcels': parcels,
         'shipping_total': shipping_total,
+        'total': subtotal + shipping_total,
         'title': _('Checkout'),
     }
     if request.method == 'POST':
         form = OrderCreateForm(request.POST)
-        if form.is_valid():
-            order = form.save(commit=False)
-            order.user = request.user
-            order.save()
-            for item in cart.items.all():
-                OrderItem.objects.create(
-                    order=order,
-                    product=item.product,
-                    price=item.product.discount_price or item.product.price,
-                    quantity=item.quantity
-                )
-            cart.items.all().delete()
+        if form.is_valid() and items:
+            try:
+                order = _place_order(form, request.user, cart, items, parcels, shipping_total)
+            except (inventory.InsufficientStock, inventory.StockBusy) as e:
+                return _stock_error(request, items, e)
+            remember_count(request, None)
             messages.success(request, _('Order placed successfully!'))
             return redirect('orders:order_detail', pk=order.id)
     else:
+        if items:
+            try:
+                context['reserved_until'] = inventory.reserve(cart, {item.product_id: item.quantity for item in items})
+            except (inventory.InsufficientStock, inventory.StockBusy) as e:
+                return _stock_error(request, items, e)
         initial_data = {
             'first_name': request.user.first_name,
             'last_name': request.user.last_name,
@@ -78,9 +115,38 @@ def order_create(request):
     context['form'] = form
     return render(request, 'orders/order_create.html', context)
 
+@login_required
+def shipping_quote(request):
+    """Shipping of the cart to ``?wilaya=``, per artist parcel, for the checkout page"""
+    wilaya = request.GET.get('wilaya', '')
+    if wilaya not in dict(Order.WILAYA_CHOICES):
+        return JsonResponse({'success': False, 'message': _('Unknown wilaya.')}, status=400)
+    items = _checkout_items(get_cart(request))
+    subtotal = sum(item.get_cost() for item in items)
+    parcels, shipping_total = shipping.quote(items, wilaya)
+    return JsonResponse({
+        'success': True,
+        'wilaya': wilaya,
+        'parcels': [
+            {
+                'artist': parcel['artist'].pk,
+                'agency': parcel['agency'],
+                'subtotal': parcel['subtotal'],
+                'shipping': parcel['shipping_price'],
+            }
+            for parcel in parcels
+        ],
+        'subtotal': subtotal,
+        'shipping_total': shipping_total,
+        'total': subtotal + shipping_total,
+    })
+
 @login_required
 def order_detail(request, pk):
-    order = get_object_or_404(Order, id=pk, user=request.user)
+    order = get_object_or_404(
+        Order.objects.prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('product__main_picture'))),
+        id=pk, user=request.user
+    )
     
     context = {
         'order': order,
@@ -109,15 +175,9 @@ def artist_orders(request):
     # Get artist profile
     artist = get_object_or_404(Artist, user=request.user)
     
-    # Get all orders containing products by this artist
-    artist_products = Product.objects.filter(artist=artist)
-    
-    # Get order items for this artist's products
-    order_items = OrderItem.objects.filter(product__in=artist_products)
-    
-    # Get unique orders
-    order_ids = order_items.values_list('order_id', flat=True).distinct()
-    orders = Order.objects.filter(id__in=order_ids).order_by('-created_at')
+    # The artist's part of each order, newest first: a range of the
+    # (artist, status, -created_at) index rather than a scan of the lines
+    orders = ArtistOrder.objects.filter(artist=artist).select_related('order').order_by('-created_at')
     
     # Filter by status if provided
     status_filter = request.GET.get('status', '')
@@ -128,37 +188,83 @@ def artist_orders(request):
     search_query = request.GET.get('search', '')
     if search_query:
         orders = orders.filter(
-            Q(id__icontains=search_query) |
-            Q(user__username__icontains=search_query) |
-            Q(user__email__icontains=search_query) |
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(email__icontains=search_query)
+            Q(order__id__icontains=search_query) |
+            Q(order__user__username__icontains=search_query) |
+            Q(order__user__email__icontains=search_query) |
+            Q(order__first_name__icontains=search_query) |
+            Q(order__last_name__icontains=search_query) |
+            Q(order__email__icontains=search_query)
         )
     
-    # Stats
-    total_orders = orders.count()
-    pending_orders = orders.filter(status='pending').count()
-    processing_orders = orders.filter(status='processing').count()
-    shipped_orders = orders.filter(status='shipped').count()
-    delivered_orders = orders.filter(status='delivered').count()
-    cancelled_orders = orders.filter(status='cancelled').count()
+    # Only this artist's lines of each listed order, in one query
+    orders = orders.prefetch_related(Prefetch(
+        'order__items', queryset=OrderItem.objects.filter(product__artist=artist).select_related('product'), to_attr='artist_items',
+    ))
+    
+    # Stats: all of the artist's orders, whatever the filters
+    order_stats = stats.artist_order_stats(artist.pk)
     
     context = {
         'orders': orders,
-        'order_items': order_items,
-        'total_orders': total_orders,
-        'pending_orders': pending_orders,
-        'processing_orders': processing_orders,
-        'shipped_orders': shipped_orders,
-        'delivered_orders': delivered_orders,
-        'cancelled_orders': cancelled_orders,
+        'total_orders': order_stats['total'],
+        'pending_orders': order_stats['pending'],
+        'processing_orders': order_stats['processing'],
+        'shipped_orders': order_stats['shipped'],
+        'delivered_orders': order_stats['delivered'],
+        'cancelled_orders': order_stats['cancelled'],
         'status_filter': status_filter,
         'search_query': search_query,
         'title': _('Manage Orders'),
     }
     return render(request, 'orders/artist_orders.html', context)
 
+@login_required
+def artist_order_stats(request):
+    """The artist's order counts per status, polled by the orders dashboard"""
+    if request.user.role != 'artist':
+        return JsonResponse({'success': False, 'message': _('You do not have permission to perform this action.')}, status=403)
+    
+    artist = get_object_or_404(Artist, user=request.user)
+    return JsonResponse({'success': True, 'stats': stats.artist_order_stats(artist.pk)})
+
+@login_required
+def artist_sales(request):
+    """
+    The artist's revenue per day over the last ``?days=`` (30 by default)
+    and their best products, from the sales rollups, for the dashboard chart
+    """
+    if request.user.role != 'artist':
+        return JsonResponse({'success': False, 'message': _('You do not have permission to perform this action.')}, status=403)
+    
+    artist = get_object_or_404(Artist, user=request.user)
+    try:
+        days = min(max(int(request.GET.get('days', 30)), 1), 365)
+    except ValueError:
+        days = 30
+    since = timezone.localdate() - timedelta(days=days - 1)
+    sales = artist.daily_sales.filter(day__gte=since).order_by()
+    
+    per_day = {
+        row['day']: row
+        for row in sales.values('day').annotate(revenue=Sum('revenue'), quantity=Sum('quantity'))
+    }
+    dates = [since + timedelta(days=i) for i in range(days)]
+    top_products = sales.values('product_id', 'product__name').annotate(
+        quantity=Sum('quantity'), revenue=Sum('revenue'),
+    ).order_by('-revenue')[:5]
+    return JsonResponse({
+        'success': True,
+        'days': [day.isoformat() for day in dates],
+        'revenue': [str(per_day[day]['revenue']) if day in per_day else '0' for day in dates],
+        'quantity': [per_day[day]['quantity'] if day in per_day else 0 for day in dates],
+        'total_revenue': str(sum((row['revenue'] for row in per_day.values()), 0)),
+        'total_quantity': sum(row['quantity'] for row in per_day.values()),
+        'top_products': [
+            {'id': row['product_id'], 'name': row['product__name'], 'quantity': row['quantity'], 'revenue': str(row['revenue'])}
+            for row in top_products
+        ],
+    })
+
 @login_required
 def artist_order_detail(request, pk):
     # Check if user is an artist
@@ -169,25 +275,22 @@ def artist_order_detail(request, pk):
     # Get artist profile
     artist = get_object_or_404(Artist, user=request.user)
     
-    # Get order
-    order = get_object_or_404(Order, id=pk)
-    
-    # Get artist's products in this order
-    artist_products = Product.objects.filter(artist=artist)
-    order_items = order.items.filter(product__in=artist_products)
+    # Get the artist's part of the order
+    artist_order = ArtistOrder.objects.select_related('order').filter(order_id=pk, artist=artist).first()
     
     # Check if artist has products in this order
-    if not order_items.exists():
+    if artist_order is None:
         messages.error(request, _('You do not have any products in this order.'))
         return redirect('orders:artist_orders')
     
-    # Calculate subtotal for artist's items
-    artist_subtotal = sum(item.get_cost() for item in order_items)
+    order = artist_order.order
+    order_items = order.items.filter(product__artist=artist).select_related('product__main_picture')
     
     context = {
         'order': order,
+        'artist_order': artist_order,
         'order_items': order_items,
-        'artist_subtotal': artist_subtotal,
+        'artist_subtotal': artist_order.subtotal,
         'title': _('Order Detail'),
     }
     return render(request, 'orders/artist_order_detail.html', context)
@@ -201,15 +304,11 @@ def update_order_status(request, pk):
     # Get artist profile
     artist = get_object_or_404(Artist, user=request.user)
     
-    # Get order
-    order = get_object_or_404(Order, id=pk)
-    
-    # Get artist's products in this order
-    artist_products = Product.objects.filter(artist=artist)
-    order_items = order.items.filter(product__in=artist_products)
+    # Get the artist's part of the order
+    artist_order = ArtistOrder.objects.select_related('order').filter(order_id=pk, artist=artist).first()
     
     # Check if artist has products in this order
-    if not order_items.exists():
+    if artist_order is None:
         return JsonResponse({'success': False, 'message': _('You do not have any products in this order.')}, status=403)
     
     if request.method == 'POST':
@@ -222,13 +321,22 @@ def update_order_status(request, pk):
             if new_status not in valid_statuses:
                 return JsonResponse({'success': False, 'message': _('Invalid status.')}, status=400)
             
-            # Update order status
-            order.status = new_status
-            order.save()
+            # Update the artist's part; the order follows its parts
+            with transaction.atomic():
+                # Cancelled parts don't count as sales
+                recount = artist_order.status != new_status and 'cancelled' in (artist_order.status, new_status)
+                if recount:
+                    rollups.subtract([artist_order.order_id])
+                artist_order.status = new_status
+                artist_order.save(update_fields=['status', 'updated_at'])
+                artist_order.order.refresh_status()
+                if recount:
+                    rollups.add([artist_order.order_id])
             
             return JsonResponse({
                 'success': True,
                 'status': new_status,
+                'order_status': artist_order.order.status,
                 'message': _('Order status updated successfully!')
             })
         except Exception as e:
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
 
-from .models import Product, Picture
+from .models import Product, Picture, RelatedProduct
 
 # Register your models here.
 class PictureInline(admin.TabularInline):
@@ -54,3 +54,10 @@ class PictureAdmin(admin.ModelAdmin):
             return format_html('<img src="{}" width="300" />', obj.image.url)
         return "-"
     image_preview.short_description = _('Image preview')
+
+@admin.register(RelatedProduct)
+class RelatedProductAdmin(admin.ModelAdmin):
+    list_display = ('product', 'rank', 'related', 'score')
+    list_select_related = ('product', 'related')
+    search_fields = ('product__name', 'related__name')
+    raw_id_fields = ('product', 'related')
@@ -0,0 +1,258 @@
+"""
+Read-only JSON catalog API, mounted at ``/api/v1/``.
+
+Products, artists and craft categories as compact JSON for partner apps.
+Lists use the storefront's keyset cursors (``?cursor=``, ``?limit=``) and
+the product list accepts the storefront filters, ``sort`` and ``q``. ``?fields=``
+trims every object to the listed fields (``?fields=id,name,price``).
+
+Responses carry an ``ETag`` derived from the rows' ``updated_at`` and the
+catalog cache version, which also moves when a product leaves the catalog,
+stock is updated or a picture changes. There is no ``Last-Modified``: no
+timestamp covers all of that. A client revalidating an unchanged page with
+``If-None-Match`` gets a ``304`` right after the page query: pictures aren't
+fetched and nothing is serialized.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Q, prefetch_related_objects
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+from artists.models import Artist
+from . import catalog_cache, search
+from .counts import craft_category_counts
+from .filters import ProductFilter, sort_ordering
+from .models import Product
+from .pagination import CursorPaginator, DEFAULT_ORDERING
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+CACHE_MAX_AGE = 60
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _url(request, url):
+    return request.build_absolute_uri(url) if url else None
+
+
+def _file_url(request, fieldfile):
+    return _url(request, fieldfile.url) if fieldfile else None
+
+
+def _money(value):
+    return str(value) if value is not None else None
+
+
+# Field name -> value, for sparse fieldsets
+PRODUCT_FIELDS = {
+    'id': lambda request, product: product.pk,
+    'slug': lambda request, product: product.slug,
+    'name': lambda request, product: product.name,
+    'description': lambda request, product: product.description,
+    'url': lambda request, product: _url(request, product.get_absolute_url()),
+    'price': lambda request, product: _money(product.price),
+    'discount_price': lambda request, product: _money(product.discount_price),
+    'effective_price': lambda request, product: _money(product.effective_price),
+    'craft_category': lambda request, product: product.craft_category,
+    'stock': lambda request, product: product.stock,
+    'featured': lambda request, product: product.featured,
+    'artist': lambda request, product: {
+        'id': product.artist_id,
+        'name': product.artist.name,
+        'url': _url(request, reverse('api:artist_detail', args=[product.artist_id])),
+    },
+    'image': lambda request, product: _file_url(request, product.main_picture.image) if product.main_picture else None,
+    'images': lambda request, product: [_file_url(request, picture.image) for picture in product.images.all()],
+    'video': lambda request, product: _file_url(request, product.video),
+    'created_at': lambda request, product: product.created_at,
+    'updated_at': lambda request, product: product.updated_at,
+}
+
+ARTIST_FIELDS = {
+    'id': lambda request, artist: artist.pk,
+    'name': lambda request, artist: artist.name,
+    'bio': lambda request, artist: artist.bio,
+    'url': lambda request, artist: _url(request, artist.get_absolute_url()),
+    'avatar': lambda request, artist: _file_url(request, artist.user.profile_picture),
+    'website': lambda request, artist: artist.website,
+    'featured': lambda request, artist: artist.featured,
+    'available': lambda request, artist: artist.availability,
+    'product_count': lambda request, artist: artist.product_count,
+    'products': lambda request, artist: _url(request, reverse('api:product_list') + f'?artist={artist.pk}'),
+    'created_at': lambda request, artist: artist.created_at,
+    'updated_at': lambda request, artist: artist.updated_at,
+}
+
+
+def _fields(request, available):
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(available)
+    fields = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise BadRequest(f'Unknown field(s): {", ".join(unknown)}. Available: {", ".join(available)}')
+    return fields
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise BadRequest('limit must be a number')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def _serialize(request, obj, serializers, fields):
+    return {name: serializers[name](request, obj) for name in fields}
+
+
+def _page_url(request, cursor):
+    if not cursor:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return _url(request, f'{request.path}?{query.urlencode()}')
+
+
+def _conditional(request, state, build):
+    """
+    Answer with ``304`` when the client's copy matches ``state`` (anything
+    that changes with the data); otherwise return ``build()`` as JSON.
+    """
+    digest = hashlib.md5(f'{catalog_cache.get_version()}|{request.get_full_path()}|{state!r}'.encode()).hexdigest()
+    etag = f'"{digest}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(build())
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=CACHE_MAX_AGE)
+    return response
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def api_view(view):
+    """GET/HEAD only; BadRequest becomes a JSON 400"""
+    @require_safe
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as e:
+            return _error(str(e), 400)
+    return wrapper
+
+
+def _products():
+    return Product.objects.filter(available=True).with_card_data()
+
+
+def _artists():
+    return Artist.objects.select_related('user').annotate(
+        product_count=Count('products', filter=Q(products__available=True)),
+    )
+
+
+@api_view
+def product_list(request):
+    fields = _fields(request, PRODUCT_FIELDS)
+    queryset, ordering = _products(), DEFAULT_ORDERING
+    query = request.GET.get('q', '')
+    if query:
+        queryset, ordering = search.search(queryset, query, ordering)
+    _sort, ordering = sort_ordering(request, ordering)
+    filterset = ProductFilter(request.GET, queryset=queryset)
+    if not filterset.is_valid():
+        raise BadRequest('; '.join(f'{name}: {" ".join(errors)}' for name, errors in filterset.errors.items()))
+
+    page = CursorPaginator(filterset.qs, _limit(request), ordering).get_page(request.GET.get('cursor'))
+    products = page.object_list
+
+    def build():
+        if 'images' in fields:
+            prefetch_related_objects(products, 'images')
+        return {
+            'results': [_serialize(request, product, PRODUCT_FIELDS, fields) for product in products],
+            'next': _page_url(request, page.next_cursor),
+            'previous': _page_url(request, page.previous_cursor),
+        }
+
+    state = [(product.pk, product.updated_at, product.artist.updated_at) for product in products]
+    return _conditional(request, state, build)
+
+
+@api_view
+def product_detail(request, slug):
+    fields = _fields(request, PRODUCT_FIELDS)
+    product = _products().filter(slug=slug).first()
+    if product is None:
+        return _error('Not found', 404)
+
+    def build():
+        if 'images' in fields:
+            prefetch_related_objects([product], 'images')
+        return _serialize(request, product, PRODUCT_FIELDS, fields)
+
+    return _conditional(request, (product.pk, product.updated_at, product.artist.updated_at), build)
+
+
+@api_view
+def artist_list(request):
+    fields = _fields(request, ARTIST_FIELDS)
+    queryset = _artists()
+    if request.GET.get('featured') in ('1', 'true'):
+        queryset = queryset.filter(featured=True)
+    page = CursorPaginator(queryset, _limit(request)).get_page(request.GET.get('cursor'))
+    artists = page.object_list
+
+    def build():
+        return {
+            'results': [_serialize(request, artist, ARTIST_FIELDS, fields) for artist in artists],
+            'next': _page_url(request, page.next_cursor),
+            'previous': _page_url(request, page.previous_cursor),
+        }
+
+    # Product counts move with products, which bump the catalog version
+    state = [(artist.pk, artist.updated_at) for artist in artists]
+    return _conditional(request, state, build)
+
+
+@api_view
+def artist_detail(request, pk):
+    fields = _fields(request, ARTIST_FIELDS)
+    artist = _artists().filter(pk=pk).first()
+    if artist is None:
+        return _error('Not found', 404)
+    return _conditional(
+        request, (artist.pk, artist.updated_at),
+        lambda: _serialize(request, artist, ARTIST_FIELDS, fields),
+    )
+
+
+@api_view
+def craft_category_list(request):
+    counts = craft_category_counts()
+
+    def build():
+        return {'results': [
+            {
+                'id': craft_id,
+                'name': str(name),
+                'product_count': counts.get(craft_id, 0),
+                'url': _url(request, reverse('categories:craft_category_detail', args=[craft_id])),
+                'products': _url(request, reverse('api:product_list') + f'?craft_category={craft_id}'),
+            }
+            for craft_id, name in Product.CRAFT_CHOICES
+        ]}
+
+    return _conditional(request, sorted(counts.items()), build)
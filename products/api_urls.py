@@ -0,0 +1,12 @@
+from django.urls import path
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('products/', api.product_list, name='product_list'),
+    path('products/<slug:slug>/', api.product_detail, name='product_detail'),
+    path('artists/', api.artist_list, name='artist_list'),
+    path('artists/<int:pk>/', api.artist_detail, name='artist_detail'),
+    path('craft-categories/', api.craft_category_list, name='craft_category_list'),
+]
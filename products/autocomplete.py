@@ -0,0 +1,176 @@
+"""
+Search-as-you-type suggestions.
+
+Every worker process keeps a sorted array of normalised search keys over
+product names, artist names and craft categories, and answers a prefix
+lookup with ``bisect`` (no database access). A label is indexed once per
+word, so "tote" finds "Handmade floral tote". Craft categories are keyed in
+every site language and keep their lazy label, which is translated into the
+request's language when suggested. The index is built on the
+first lookup, kept current in this process by the signal handlers in
+``products.signals``, and rebuilt every ``MAX_AGE`` seconds so other
+workers pick up changes made elsewhere.
+"""
+import logging
+import sys
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils import translation
+
+from artists.models import Artist
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+MAX_RESULTS = 8
+MIN_PREFIX = 2
+MAX_AGE = 10 * 60
+
+# Result kinds, in the order they are listed for equal keys
+CATEGORY, ARTIST, PRODUCT = 'category', 'artist', 'product'
+KIND_ORDER = {CATEGORY: 0, ARTIST: 1, PRODUCT: 2}
+
+
+def normalize(text):
+    """Lowercase, strip accents and collapse whitespace"""
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().split())
+
+
+def _keys(label):
+    """The label's normalised suffixes starting at each word"""
+    words = normalize(label).split()
+    return {' '.join(words[i:]) for i in range(len(words))}
+
+
+def _translated_keys(label):
+    """The keys of a lazily translated label in every site language"""
+    keys = set()
+    for language, _name in settings.LANGUAGES:
+        with translation.override(language):
+            keys |= _keys(label)
+    return keys
+
+
+class SuggestionIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []  # sorted (key, kind order, kind, id)
+        self._items = {}  # (kind, id) -> (label, url, keys)
+        self.built_at = None
+
+    def _add(self, kind, pk, label, url):
+        keys = _keys(label)
+        self._items[(kind, pk)] = (label, url, keys)
+        for key in keys:
+            insort(self._entries, (key, KIND_ORDER[kind], kind, pk))
+
+    def _remove(self, kind, pk):
+        item = self._items.pop((kind, pk), None)
+        if item is None:
+            return
+        for key in item[2]:
+            entry = (key, KIND_ORDER[kind], kind, pk)
+            i = bisect_left(self._entries, entry)
+            if i < len(self._entries) and self._entries[i] == entry:
+                del self._entries[i]
+
+    def build(self):
+        started = time.monotonic()
+        entries, items = [], {}
+
+        def collect(kind, pk, label, url, keys=None):
+            keys = keys or _keys(label)
+            items[(kind, pk)] = (label, url, keys)
+            entries.extend((key, KIND_ORDER[kind], kind, pk) for key in keys)
+
+        for craft_id, name in Product.CRAFT_CHOICES:
+            url = reverse('categories:craft_category_detail', args=[craft_id])
+            collect(CATEGORY, craft_id, name, url, _translated_keys(name))
+        for pk, name in Artist.objects.filter(availability=True).values_list('pk', 'name'):
+            collect(ARTIST, pk, name, reverse('artists:artist_detail', args=[pk]))
+        for pk, name, slug in Product.objects.filter(available=True).values_list('pk', 'name', 'slug'):
+            collect(PRODUCT, pk, name, reverse('products:product_detail', args=[slug]))
+
+        entries.sort()
+        with self._lock:
+            self._entries, self._items = entries, items
+            self.built_at = time.monotonic()
+        logger.info(
+            'Autocomplete index built in %.3fs: %s',
+            time.monotonic() - started, self.stats(),
+        )
+
+    def _ensure_built(self):
+        if self.built_at is None or time.monotonic() - self.built_at > MAX_AGE:
+            self.build()
+
+    def suggest(self, query, limit=MAX_RESULTS):
+        """Up to ``limit`` suggestions whose words start with ``query``"""
+        prefix = normalize(query)
+        if len(prefix) < MIN_PREFIX:
+            return []
+        limit = max(1, min(int(limit), MAX_RESULTS))
+        self._ensure_built()
+
+        results, seen = [], set()
+        with self._lock:
+            entries = self._entries
+            i = bisect_left(entries, (prefix,))
+            while i < len(entries) and len(results) < limit:
+                key, _order, kind, pk = entries[i]
+                if not key.startswith(prefix):
+                    break
+                if (kind, pk) not in seen:
+                    seen.add((kind, pk))
+                    label, url, _item_keys = self._items[(kind, pk)]
+                    # Category labels are lazy: translate them for this request
+                    results.append({'type': kind, 'label': str(label), 'url': url})
+                i += 1
+        return results
+
+    def update_product(self, product):
+        if self.built_at is None:
+            return
+        with self._lock:
+            self._remove(PRODUCT, product.pk)
+            if product.available:
+                self._add(PRODUCT, product.pk, product.name, product.get_absolute_url())
+
+    def remove_product(self, pk):
+        if self.built_at is None:
+            return
+        with self._lock:
+            self._remove(PRODUCT, pk)
+
+    def update_artist(self, artist):
+        if self.built_at is None:
+            return
+        with self._lock:
+            self._remove(ARTIST, artist.pk)
+            if artist.availability:
+                self._add(ARTIST, artist.pk, artist.name, reverse('artists:artist_detail', args=[artist.pk]))
+
+    def remove_artist(self, pk):
+        if self.built_at is None:
+            return
+        with self._lock:
+            self._remove(ARTIST, pk)
+
+    def stats(self):
+        """Entry counts and the approximate memory held by the index"""
+        size = sys.getsizeof(self._entries) + sys.getsizeof(self._items)
+        for entry in self._entries:
+            size += sys.getsizeof(entry) + sys.getsizeof(entry[0])
+        for item_key, (label, url, keys) in self._items.items():
+            size += sys.getsizeof(item_key) + sys.getsizeof(label) + sys.getsizeof(url) + sys.getsizeof(keys)
+        return {'entries': len(self._entries), 'items': len(self._items), 'bytes': size}
+
+
+index = SuggestionIndex()
@@ -0,0 +1,51 @@
+"""
+Versioned cache for catalog pages.
+
+Every key is namespaced under ``catalog`` and embeds the current catalog
+version (``catalog:v42:product:<slug>``). Saving or deleting a product,
+picture or artist bumps the version (see ``products.signals``), which
+retires every catalog entry at once without having to know their keys;
+stale entries simply expire. Only ``get``/``set``/``add``/``incr`` are used,
+so it works the same on the local-memory, file-based and Redis backends.
+"""
+from django.core.cache import cache
+
+NAMESPACE = 'catalog'
+VERSION_KEY = f'{NAMESPACE}:version'
+DEFAULT_TIMEOUT = 15 * 60
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Never expires: a lost version counter would resurrect old entries
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_version():
+    """Invalidate every catalog entry"""
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        # No counter yet (first write, or the cache was flushed)
+        cache.add(VERSION_KEY, 1, timeout=None)
+        try:
+            return cache.incr(VERSION_KEY)
+        except ValueError:
+            return None  # a cache that keeps nothing (DummyCache) has nothing to retire
+
+
+def make_key(*parts):
+    return ':'.join([NAMESPACE, f'v{get_version()}', *map(str, parts)])
+
+
+def get_or_build(parts, build, timeout=DEFAULT_TIMEOUT):
+    """Return the cached value for ``parts``, computing it with ``build()`` on a miss"""
+    key = make_key(*parts)
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,224 @@
+"""
+Bulk catalog import and export (CSV or JSON Lines).
+
+Files are streamed row by row and written to the database in chunks with
+``bulk_create``, so a 100k product catalog never sits in memory. Because
+``bulk_create`` sends no ``post_save`` signals, the work those handlers do
+(search documents, main pictures, cached counts and pages) is done once per
+chunk instead. Picture files are copied into media storage by a thread pool
+while the rows are validated.
+"""
+import csv
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django import forms
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.text import slugify
+
+from artists.models import Artist
+from . import catalog_cache, counts, search
+from .forms import ProductForm
+from .models import Picture, Product
+
+# Columns of an export, and the ones an import understands
+FIELDS = (
+    'name', 'slug', 'description', 'price', 'discount_price', 'craft_category',
+    'stock', 'available', 'featured', 'artist', 'images',
+)
+IMAGE_SEPARATOR = ';'
+DEFAULT_CHUNK_SIZE = 500
+SLUG_MAX_LENGTH = Product._meta.get_field('slug').max_length
+
+
+class ProductImportForm(ProductForm):
+    """Validation of one imported row, with the same rules as the artist form"""
+    artist = forms.IntegerField()
+
+    class Meta(ProductForm.Meta):
+        fields = ('name', 'description', 'price', 'discount_price', 'craft_category', 'stock', 'available', 'featured')
+
+
+def detect_format(path):
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(fileobj, fmt):
+    """Yield one dict per row without reading the whole file"""
+    if fmt == 'jsonl':
+        for line in fileobj:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        yield from csv.DictReader(fileobj)
+
+
+class RowWriter:
+    def __init__(self, fileobj, fmt):
+        self.fileobj = fileobj
+        self.fmt = fmt
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(fileobj, fieldnames=FIELDS)
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == 'jsonl':
+            self.fileobj.write(json.dumps(row, ensure_ascii=False) + '\n')
+        else:
+            self.writer.writerow(row)
+
+
+class SlugAllocator:
+    """Hands out slugs that collide neither with the database nor with each other"""
+
+    def __init__(self):
+        self.used = set(Product.objects.values_list('slug', flat=True).iterator(chunk_size=5000))
+        self.next_suffix = {}
+
+    def allocate(self, name):
+        base = slugify(name)[:SLUG_MAX_LENGTH - 8].strip('-') or 'product'
+        slug = base
+        suffix = self.next_suffix.get(base, 2)
+        while slug in self.used:
+            slug = f'{base}-{suffix}'
+            suffix += 1
+        self.next_suffix[base] = suffix
+        self.used.add(slug)
+        return slug
+
+
+def _copy_image(images_dir, relative_name):
+    """Copy one picture into media storage; returns the stored name"""
+    path = os.path.join(images_dir, relative_name)
+    upload_to = Picture._meta.get_field('image').upload_to
+    with open(path, 'rb') as source:
+        return default_storage.save(f'{upload_to}/{os.path.basename(relative_name)}', File(source))
+
+
+def _split_images(value):
+    if isinstance(value, list):
+        return [name for name in value if name]
+    return [name.strip() for name in re.split(IMAGE_SEPARATOR, value or '') if name.strip()]
+
+
+def export_products(fileobj, fmt, queryset=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream products to ``fileobj``. Returns the number of rows written."""
+    queryset = queryset if queryset is not None else Product.objects.all()
+    writer = RowWriter(fileobj, fmt)
+    written = 0
+    for product in queryset.order_by('pk').prefetch_related('images').iterator(chunk_size=chunk_size):
+        writer.write({
+            'name': product.name,
+            'slug': product.slug,
+            'description': product.description,
+            'price': str(product.price),
+            'discount_price': str(product.discount_price) if product.discount_price is not None else '',
+            'craft_category': product.craft_category,
+            'stock': product.stock,
+            'available': product.available,
+            'featured': product.featured,
+            'artist': product.artist_id,
+            'images': IMAGE_SEPARATOR.join(picture.image.name for picture in product.images.all()),
+        })
+        written += 1
+    return written
+
+
+class Importer:
+    """
+    Import rows in chunks. ``report(event, **data)`` is called after every
+    chunk and for every rejected row.
+    """
+
+    def __init__(self, images_dir=None, default_artist=None, chunk_size=DEFAULT_CHUNK_SIZE, workers=8, report=None):
+        self.images_dir = images_dir
+        self.default_artist = default_artist
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.report = report or (lambda event, **data: None)
+        self.slugs = SlugAllocator()
+        self.artist_ids = set(Artist.objects.values_list('pk', flat=True))
+        self.products = self.pictures = self.rejected = 0
+        self.pool = None
+
+    def _reject(self, line, errors):
+        self.report('rejected', line=line, errors=errors)
+        self.rejected += 1
+
+    def _clean(self, line, row):
+        data = {key: value for key, value in row.items() if value not in (None, '')}
+        data.setdefault('available', True)
+        data.setdefault('stock', 1)
+        if self.default_artist and 'artist' not in data:
+            data['artist'] = self.default_artist
+        form = ProductImportForm(data)
+        if not form.is_valid():
+            self._reject(line, '; '.join(f'{field}: {" ".join(messages)}' for field, messages in form.errors.items()))
+            return None
+        if form.cleaned_data['artist'] not in self.artist_ids:
+            self._reject(line, f'artist: no artist with id {form.cleaned_data["artist"]}')
+            return None
+        product = form.save(commit=False)
+        product.artist_id = form.cleaned_data['artist']
+        product.refresh_effective_price()  # bulk_create skips save()
+        product.slug = self.slugs.allocate(row.get('slug') or product.name)
+        
+        # Start copying the pictures now; later rows are validated meanwhile
+        copies = []
+        if self.images_dir:
+            copies = [self.pool.submit(_copy_image, self.images_dir, name) for name in _split_images(row.get('images'))]
+        return product, copies
+
+    def _write_chunk(self, chunk):
+        products = [product for product, _copies in chunk]
+        copies = [futures for _product, futures in chunk]
+
+        with transaction.atomic():
+            Product.objects.bulk_create(products)
+            if any(product.pk is None for product in products):
+                # Backends that don't return ids from bulk inserts (MySQL)
+                ids = dict(Product.objects.filter(slug__in=[p.slug for p in products]).values_list('slug', 'pk'))
+                for product in products:
+                    product.pk = ids[product.slug]
+
+            pictures = []
+            for product, futures in zip(products, copies):
+                for position, future in enumerate(futures):
+                    try:
+                        stored_name = future.result()
+                    except OSError as e:
+                        self.report('missing_image', product=product.slug, error=str(e))
+                        continue
+                    pictures.append(Picture(product=product, artist_id=product.artist_id, image=stored_name, is_main=position == 0))
+            Picture.objects.bulk_create(pictures)
+
+            # What the post_save handlers would have done row by row
+            ids = [product.pk for product in products]
+            Product.objects.filter(pk__in=ids).refresh_main_pictures()
+            search.index_products(ids)
+
+        self.products += len(products)
+        self.pictures += len(pictures)
+        self.report('chunk', products=self.products, pictures=self.pictures, rejected=self.rejected)
+
+    def run(self, rows):
+        chunk = []
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='import-images') as self.pool:
+            for line, row in enumerate(rows, start=1):
+                cleaned = self._clean(line, row)
+                if cleaned is not None:
+                    chunk.append(cleaned)
+                if len(chunk) >= self.chunk_size:
+                    self._write_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self._write_chunk(chunk)
+
+        if self.products:
+            counts.invalidate_craft_category_counts()
+            catalog_cache.bump_version()
+        return self.products, self.pictures, self.rejected
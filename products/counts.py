@@ -0,0 +1,29 @@
+"""
+Cached per-craft-category product counts.
+
+The craft category list, the home page category cards and the chatbot all
+show how many available products each craft type has. The counts come from
+one grouped query and are cached until a product is added, deleted, or has
+its ``available`` flag or craft category changed (see ``products.signals``).
+"""
+from django.core.cache import cache
+
+from .models import Product
+
+CRAFT_COUNTS_CACHE_KEY = 'products:craft-category-counts'
+# Safety net for changes made with queryset.update(), which sends no signals
+CRAFT_COUNTS_TIMEOUT = 60 * 60
+
+
+def craft_category_counts():
+    """{craft_id: available product count} for every craft choice"""
+    counts = cache.get(CRAFT_COUNTS_CACHE_KEY)
+    if counts is None:
+        counts = {craft_id: 0 for craft_id, _name in Product.CRAFT_CHOICES}
+        counts.update(Product.objects.filter(available=True).count_by_craft_category())
+        cache.set(CRAFT_COUNTS_CACHE_KEY, counts, CRAFT_COUNTS_TIMEOUT)
+    return counts
+
+
+def invalidate_craft_category_counts():
+    cache.delete(CRAFT_COUNTS_CACHE_KEY)
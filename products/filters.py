@@ -0,0 +1,258 @@
+"""
+Faceted catalog filtering.
+
+``ProductFilter`` is the filter surface for the catalog pages. ``build_facets``
+computes the counts shown next to every facet option from a single grouped
+aggregate: the base queryset is grouped by all facet dimensions at once, and
+each facet's counts are then summed in Python from the rows matching every
+*other* active filter. The grouped rows are kept in the catalog cache per
+base queryset, so toggling filters on the same search or category costs no
+extra query.
+
+Sorting by price and the price range work on ``Product.effective_price``
+(the price a buyer pays), so both are plain indexed column lookups.
+"""
+import hashlib
+
+import django_filters
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, CharField, Count, Q, Value, When
+from django.utils.translation import gettext_lazy as _
+
+from users.models import User
+from . import catalog_cache
+from .models import ON_DISCOUNT, Product
+from .pagination import DEFAULT_ORDERING
+
+# (key, label, lower bound inclusive, upper bound exclusive) in DA
+PRICE_BANDS = (
+    ('under-1000', _('Under 1,000 DA'), None, 1000),
+    ('1000-3000', _('1,000 - 3,000 DA'), 1000, 3000),
+    ('3000-10000', _('3,000 - 10,000 DA'), 3000, 10000),
+    ('over-10000', _('Over 10,000 DA'), 10000, None),
+)
+
+FACET_CACHE_TIMEOUT = 300
+MAX_FACET_OPTIONS = 10
+
+# Facet name -> column of the grouped rows
+FACET_COLUMNS = {
+    'craft_category': 'craft_category',
+    'price_band': 'price_band',
+    'on_discount': 'on_discount',
+    'in_stock': 'in_stock',
+    'artist': 'artist_id',
+    'wilaya': 'artist__user__wilaya',
+}
+
+FACET_LABELS = {
+    'craft_category': _('Craft Type'),
+    'price_band': _('Price'),
+    'on_discount': _('Offers'),
+    'in_stock': _('Availability'),
+    'artist': _('Artist'),
+    'wilaya': _('Wilaya'),
+}
+
+# Sort keys -> keyset ordering; relevance (search) and newest are the defaults
+SORT_CHOICES = (
+    ('price_asc', _('Price: low to high')),
+    ('price_desc', _('Price: high to low')),
+)
+SORT_ORDERINGS = {
+    'price_asc': ('effective_price', 'id'),
+    'price_desc': ('-effective_price', '-id'),
+}
+
+# Filters that narrow every facet count instead of being facets themselves
+PRICE_RANGE_FILTERS = ('min_price', 'max_price')
+
+
+def _price_band_q(low, high):
+    q = Q()
+    if low is not None:
+        q &= Q(effective_price__gte=low)
+    if high is not None:
+        q &= Q(effective_price__lt=high)
+    return q
+
+
+class ProductFilter(django_filters.FilterSet):
+    craft_category = django_filters.ChoiceFilter(choices=Product.CRAFT_CHOICES)
+    price_band = django_filters.ChoiceFilter(
+        choices=[(key, label) for key, label, _low, _high in PRICE_BANDS],
+        method='filter_price_band',
+    )
+    on_discount = django_filters.BooleanFilter(method='filter_on_discount')
+    in_stock = django_filters.BooleanFilter(method='filter_in_stock')
+    artist = django_filters.NumberFilter(field_name='artist_id')
+    wilaya = django_filters.ChoiceFilter(field_name='artist__user__wilaya', choices=User.WILAYA_CHOICES)
+    min_price = django_filters.NumberFilter(field_name='effective_price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name='effective_price', lookup_expr='lte')
+
+    class Meta:
+        model = Product
+        fields = []
+
+    def filter_price_band(self, queryset, name, value):
+        for key, _label, low, high in PRICE_BANDS:
+            if key == value:
+                return queryset.filter(_price_band_q(low, high))
+        return queryset
+
+    def filter_on_discount(self, queryset, name, value):
+        return queryset.filter(ON_DISCOUNT) if value else queryset.exclude(ON_DISCOUNT)
+
+    def filter_in_stock(self, queryset, name, value):
+        return queryset.filter(stock__gt=0) if value else queryset.filter(stock=0)
+
+    @property
+    def active_filters(self):
+        """Cleaned filter values that are set, in the same form as the grouped rows"""
+        if not self.is_bound:
+            return {}
+        # Invalid values are dropped from cleaned_data, as in filter_queryset()
+        self.errors
+        active = {}
+        for name, value in self.form.cleaned_data.items():
+            if value in (None, '') or name in PRICE_RANGE_FILTERS:
+                continue
+            active[name] = int(value) if name == 'artist' else value
+        return active
+
+
+def _grouped_rows(queryset):
+    """One GROUP BY over every facet dimension of the base queryset (cached)"""
+    sql, params = queryset.query.sql_with_params()
+    cache_key = catalog_cache.make_key('facets', hashlib.md5(f'{sql}|{params!r}'.encode()).hexdigest())
+    rows = cache.get(cache_key)
+    if rows is None:
+        price_band = Case(
+            *[When(_price_band_q(low, high), then=Value(key)) for key, _label, low, high in PRICE_BANDS],
+            output_field=CharField(),
+        )
+        rows = list(
+            queryset.order_by()
+            .annotate(
+                price_band=price_band,
+                on_discount=Case(When(ON_DISCOUNT, then=Value(True)), default=Value(False), output_field=BooleanField()),
+                in_stock=Case(When(stock__gt=0, then=Value(True)), default=Value(False), output_field=BooleanField()),
+            )
+            .values(*FACET_COLUMNS.values(), 'artist__name')
+            .annotate(count=Count('pk'))
+        )
+        cache.set(cache_key, rows, FACET_CACHE_TIMEOUT)
+    return rows
+
+
+def _in_price_range(queryset, filterset):
+    """The base queryset narrowed to the requested price range, if any"""
+    if not filterset.is_bound:
+        return queryset
+    filterset.errors
+    for name in PRICE_RANGE_FILTERS:
+        value = filterset.form.cleaned_data.get(name)
+        if value is not None:
+            queryset = filterset.filters[name].filter(queryset, value)
+    return queryset
+
+
+def sort_ordering(request, default=DEFAULT_ORDERING):
+    """(sort key, keyset ordering) for the ``sort`` parameter"""
+    sort = request.GET.get('sort', '')
+    if sort in SORT_ORDERINGS:
+        return sort, SORT_ORDERINGS[sort]
+    return '', default
+
+
+def sort_controls(request, filterset, default_label):
+    """Sort menu and price range inputs; every other parameter is carried along"""
+    sort, _ordering = sort_ordering(request)
+    hidden = [
+        (name, value)
+        for name, values in request.GET.lists() if name not in ('sort', 'cursor', *PRICE_RANGE_FILTERS)
+        for value in values
+    ]
+    cleaned = {}
+    if filterset.is_bound:
+        filterset.errors
+        cleaned = filterset.form.cleaned_data
+    return {
+        'hidden': hidden,
+        'sort': sort,
+        'options': [('', default_label), *SORT_CHOICES],
+        'min_price': cleaned.get('min_price'),
+        'max_price': cleaned.get('max_price'),
+    }
+
+
+def facet_counts(queryset, active):
+    """
+    Return ({facet: {value: count}}, {artist_id: artist name}).
+
+    Each facet's counts apply every active filter except its own, so the
+    options of a facet stay visible once one of them is selected.
+    """
+    rows = _grouped_rows(queryset)
+    counts = {facet: {} for facet in FACET_COLUMNS}
+    for row in rows:
+        for facet, column in FACET_COLUMNS.items():
+            if all(row[FACET_COLUMNS[other]] == value for other, value in active.items() if other != facet):
+                bucket = counts[facet]
+                bucket[row[column]] = bucket.get(row[column], 0) + row['count']
+    artist_names = {row['artist_id']: row['artist__name'] for row in rows}
+    return counts, artist_names
+
+
+def facet_total(queryset, filterset):
+    """Number of products matching every active filter, from the cached grouped rows"""
+    active = filterset.active_filters
+    return sum(
+        row['count'] for row in _grouped_rows(_in_price_range(queryset, filterset))
+        if all(row[FACET_COLUMNS[facet]] == value for facet, value in active.items())
+    )
+
+
+def build_facets(request, queryset, filterset, exclude=()):
+    """Sidebar data: every facet with its options, counts and toggle links"""
+    active = filterset.active_filters
+    counts, artist_names = facet_counts(_in_price_range(queryset, filterset), active)
+
+    def option(facet, value, label, count):
+        params = request.GET.copy()
+        params.pop('cursor', None)
+        selected = active.get(facet) == value
+        if selected:
+            params.pop(facet, None)
+        else:
+            params[facet] = 'true' if value is True else value
+        return {
+            'label': label,
+            'count': count,
+            'selected': selected,
+            'query': params.urlencode(),
+        }
+
+    options = {
+        'craft_category': [(key, label) for key, label in Product.CRAFT_CHOICES],
+        'price_band': [(key, label) for key, label, _low, _high in PRICE_BANDS],
+        'on_discount': [(True, _('On discount'))],
+        'in_stock': [(True, _('In stock'))],
+        'artist': list(artist_names.items()),
+        'wilaya': [(key, label) for key, label in User.WILAYA_CHOICES],
+    }
+
+    facets = []
+    for facet, choices in options.items():
+        if facet in exclude:
+            continue
+        facet_options = [
+            option(facet, value, label, counts[facet].get(value, 0))
+            for value, label in choices
+            if counts[facet].get(value) or active.get(facet) == value
+        ]
+        if facet in ('artist', 'wilaya'):
+            facet_options = sorted(facet_options, key=lambda o: (not o['selected'], -o['count']))[:MAX_FACET_OPTIONS]
+        if facet_options:
+            facets.append({'name': facet, 'label': FACET_LABELS[facet], 'options': facet_options})
+    return facets
@@ -0,0 +1,131 @@
+"""
+Responsive image derivatives.
+
+Every uploaded image gets fixed-width WebP and JPEG variants stored next to
+the original (``products/_w/<name>.png-320.webp``). The names are derived
+from the original file name alone, so templates can build ``srcset``
+attributes without touching the database. They keep the original extension:
+``a.png`` and ``a.jpg`` in one directory must not share derivatives.
+Derivatives are only built on local storage; Cloudinary resizes on its own
+CDN.
+"""
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = (96, 320, 640, 1280)
+DERIVATIVE_DIR = '_w'
+# (extension, Pillow format, save options)
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+# Image fields that get derivatives on upload: (app_label.Model, field name)
+IMAGE_FIELDS = (
+    ('products.Picture', 'image'),
+    ('community.PostImage', 'image'),
+    ('categories.Category', 'image'),
+    ('users.User', 'profile_picture'),
+)
+
+# Small pool so uploads return before the resizing is done
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='derivatives')
+
+
+def derivative_name(name, width, ext):
+    dirname, filename = posixpath.split(name)
+    return posixpath.join(dirname, DERIVATIVE_DIR, f'{filename}-{width}.{ext}')
+
+
+def supports_derivatives(storage):
+    return isinstance(storage, FileSystemStorage)
+
+
+def has_derivatives(fieldfile):
+    """True when the derivatives of an image field have been built"""
+    if not fieldfile or not supports_derivatives(fieldfile.storage):
+        return False
+    return fieldfile.storage.exists(derivative_name(fieldfile.name, WIDTHS[-1], FORMATS[-1][0]))
+
+
+def derivative_urls(fieldfile, ext):
+    """[(width, url), ...] for every derivative width in the given format"""
+    storage = fieldfile.storage
+    return [(width, storage.url(derivative_name(fieldfile.name, width, ext))) for width in WIDTHS]
+
+
+def _flatten(image):
+    """JPEG has no alpha channel: composite transparent images onto white"""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_derivatives(name, storage=None, force=False):
+    """Build every width/format of one stored image. Returns the number of files written."""
+    storage = storage or default_storage
+    if not force and storage.exists(derivative_name(name, WIDTHS[-1], FORMATS[-1][0])):
+        return 0
+
+    with storage.open(name, 'rb') as source:
+        image = Image.open(source)
+        image = _flatten(ImageOps.exif_transpose(image))
+
+    written = 0
+    for width in WIDTHS:
+        # Never upscale: small originals are stored at their own size
+        resized = image
+        if image.width > width:
+            resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        for ext, image_format, options in FORMATS:
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, **options)
+            target = derivative_name(name, width, ext)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+            written += 1
+    return written
+
+
+def delete_derivatives(name, storage=None):
+    storage = storage or default_storage
+    for width in WIDTHS:
+        for ext, _format, _options in FORMATS:
+            target = derivative_name(name, width, ext)
+            if storage.exists(target):
+                storage.delete(target)
+
+
+def _generate_quietly(name, storage):
+    try:
+        generate_derivatives(name, storage)
+    except Exception:
+        logger.exception('Could not build image derivatives for %s', name)
+
+
+def schedule_derivatives(fieldfile):
+    """Build derivatives in the background once the upload is committed"""
+    if not fieldfile or not supports_derivatives(fieldfile.storage) or has_derivatives(fieldfile):
+        return
+    name, storage = fieldfile.name, fieldfile.storage
+    transaction.on_commit(lambda: _executor.submit(_generate_quietly, name, storage))
+
+
+def schedule_deletion(name, storage):
+    """Delete the derivatives of a replaced or deleted image once the change is committed"""
+    if not name or not supports_derivatives(storage):
+        return
+    transaction.on_commit(lambda: delete_derivatives(name, storage))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products import autocomplete
+
+
+class Command(BaseCommand):
+    help = 'Build the autocomplete index and report its size and lookup latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('prefixes', nargs='*', default=['ha', 'je', 'tra', 'po'], help='Prefixes to time')
+        parser.add_argument('--repeat', type=int, default=1000, help='Lookups per prefix')
+
+    def handle(self, *args, **options):
+        index = autocomplete.SuggestionIndex()
+
+        started = time.monotonic()
+        index.build()
+        build_time = time.monotonic() - started
+
+        stats = index.stats()
+        self.stdout.write(
+            f"{stats['items']} items, {stats['entries']} keys, ~{stats['bytes'] / 1024:.1f} KiB, built in {build_time * 1000:.1f} ms"
+        )
+
+        for prefix in options['prefixes']:
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                results = index.suggest(prefix)
+            elapsed = (time.perf_counter() - started) / options['repeat']
+            self.stdout.write(f'{prefix!r}: {len(results)} results, {elapsed * 1e6:.1f} µs per lookup')
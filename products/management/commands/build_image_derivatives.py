@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from products import images
+
+
+def _build(name, force):
+    try:
+        return name, images.generate_derivatives(name, force=force), None
+    except Exception as e:
+        return name, 0, str(e)
+
+
+class Command(BaseCommand):
+    help = 'Build responsive image derivatives for existing product, post, category and profile pictures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (defaults to the CPU count)')
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that already exist')
+
+    def handle(self, *args, **options):
+        if not images.supports_derivatives(default_storage):
+            self.stdout.write(self.style.WARNING('Media is not on local storage; derivatives are served by the CDN.'))
+            return
+
+        names = set()
+        for model_label, field_name in images.IMAGE_FIELDS:
+            model = apps.get_model(model_label)
+            names.update(
+                model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                .values_list(field_name, flat=True)
+            )
+
+        # Workers only touch files; don't fork open database connections
+        connections.close_all()
+
+        started = time.monotonic()
+        built = skipped = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            futures = [pool.submit(_build, name, options['force']) for name in sorted(names)]
+            for future in as_completed(futures):
+                name, written, error = future.result()
+                if error:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'{name}: {error}'))
+                elif written:
+                    built += 1
+                else:
+                    skipped += 1
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{built} images processed, {skipped} already up to date, {failed} failed in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the "customers also bought" neighbours of every product from order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=recommendations.TOP_K, help='Neighbours kept per product')
+        parser.add_argument('--include-carts', action='store_true', help='Also count products sitting in the same cart')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        products, rows = recommendations.build_related_products(
+            k=options['top_k'],
+            include_carts=options['include_carts'],
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{rows} neighbours stored for {products} products in {elapsed:.1f}s'
+        ))
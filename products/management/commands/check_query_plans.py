@@ -0,0 +1,151 @@
+import json
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from artists.models import Artist
+from chatbot.models import ChatMessage, ChatSession
+from community.models import Activity, Message, Notification, Post
+from products.models import Product
+
+# Tables that grow with traffic: a full scan of one of them is a regression
+HOT_TABLES = {model._meta.db_table for model in (Product, Notification, Message, Post, Activity, ChatMessage)}
+
+# Django's table aliases in joins and subqueries ("community_post" U1)
+ALIAS_RE = re.compile(r'[`"](\w+)[`"] (?:AS )?[`"]?([A-Z]\d+)\b')
+SQLITE_SCAN_RE = re.compile(r'^SCAN (\w+)$')
+# Backends full_scans() can read plans from
+PLAN_VENDORS = ('sqlite', 'postgresql', 'mysql')
+
+
+def hot_pages():
+    """(label, url, log in?) of the busiest pages, built from whatever the database holds"""
+    pages = [
+        ('home', reverse('community:public_homepage'), False),
+        ('feed', reverse('community:feed'), True),
+        ('shop', reverse('products:product_list'), False),
+        ('search', reverse('products:product_search'), False),
+        ('notifications', reverse('community:notifications'), True),
+        ('messages', reverse('community:messages_list'), True),
+        ('notification counts', reverse('community:get_notification_counts'), True),
+    ]
+    product = Product.objects.filter(available=True).first()
+    if product:
+        pages += [
+            ('product', product.get_absolute_url(), False),
+            ('craft category', reverse('categories:craft_category_detail', args=[product.craft_category]), False),
+            ('search by craft', reverse('products:product_search') + f'?craft_category={product.craft_category}', False),
+        ]
+    artist = Artist.objects.first()
+    if artist:
+        pages.append(('artist', reverse('artists:artist_detail', args=[artist.pk]), False))
+    post = Post.objects.filter(is_public=True).first()
+    if post:
+        pages.append(('post', reverse('community:post_detail', args=[post.pk]), True))
+    session = ChatSession.objects.first()
+    if session:
+        pages.append(('chat history', reverse('chatbot:chat_history', args=[session.session_id]), False))
+    return pages
+
+
+def _tables(sql):
+    aliases = {alias: table for table, alias in ALIAS_RE.findall(sql)}
+    return lambda name: aliases.get(name, name)
+
+
+def full_scans(sql):
+    """Hot tables that ``sql`` reads without an index"""
+    table_of = _tables(sql)
+    scans = set()
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            for row in cursor.fetchall():
+                match = SQLITE_SCAN_RE.match(row[-1])
+                if match:
+                    scans.add(table_of(match.group(1)))
+        elif connection.vendor == 'postgresql':
+            # A seeded database is small enough that a sequential scan is
+            # cheapest anyway; forbid it to see whether an index could serve
+            with transaction.atomic():
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+                plan = cursor.fetchone()[0]
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            nodes = [plan[0]['Plan']]
+            while nodes:
+                node = nodes.pop()
+                if node['Node Type'] == 'Seq Scan':
+                    scans.add(node['Relation Name'])
+                nodes.extend(node.get('Plans', []))
+        elif connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql)
+            columns = [column[0] for column in cursor.description]
+            for row in cursor.fetchall():
+                row = dict(zip(columns, row))
+                if row['type'] == 'ALL' and row['table']:
+                    scans.add(table_of(row['table']))
+        else:
+            raise CommandError(f'No query plan support for {connection.vendor}')
+    return scans & HOT_TABLES
+
+
+class Command(BaseCommand):
+    help = (
+        'Load the busiest pages, EXPLAIN every query they run and fail if one of them '
+        'reads a large table (products, posts, messages...) without an index. '
+        'Run it against a seeded database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every checked query')
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(is_active=True, notifications__isnull=False).first()
+        user = user or get_user_model().objects.filter(is_active=True).first()
+        client = Client()
+        if user:
+            client.force_login(user)
+
+        regressions = []
+        settings = {
+            'ALLOWED_HOSTS': ['testserver'],
+            'SECURE_SSL_REDIRECT': False,
+            # Cached pages would hide their queries
+            'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        }
+        with override_settings(**settings):
+            for label, url, logged_in in hot_pages():
+                if logged_in and not user:
+                    continue
+                page_client = client if logged_in else Client()
+                with CaptureQueriesContext(connection) as captured:
+                    response = page_client.get(url)
+                selects = [query['sql'] for query in captured.captured_queries if query['sql'].lstrip().upper().startswith('SELECT')]
+                page_scans = set()
+                for sql in selects:
+                    scans = full_scans(sql)
+                    if scans:
+                        regressions.append((label, scans, sql))
+                        page_scans |= scans
+                    if options['verbose_plans']:
+                        self.stdout.write(f'  {sql[:160]}')
+                status = ', '.join(sorted(page_scans)) if page_scans else 'ok'
+                self.stdout.write(f'{label:<20} {url:<50} {response.status_code} {len(selects):>3} selects  {status}')
+
+        if regressions:
+            for label, scans, sql in regressions:
+                self.stderr.write(f'\n[{label}] full scan of {", ".join(sorted(scans))}:\n{sql}')
+            if connection.vendor == 'sqlite':
+                self.stderr.write(
+                    '\nNote: SQLite cannot match the bare boolean terms Django writes for filter(flag=True) '
+                    '(WHERE "available") to a regular index; a partial index with that condition works '
+                    '(see product_live_created_idx).'
+                )
+            raise CommandError(f'{len(regressions)} queries read a large table without an index')
+        self.stdout.write(self.style.SUCCESS('Every hot query uses an index.'))
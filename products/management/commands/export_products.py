@@ -0,0 +1,34 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from products import catalog_io
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Stream every product to a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="Output file, or '-' for standard output")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--artist', type=int, help='Only export this artist\'s products')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or catalog_io.detect_format(path)
+        queryset = Product.objects.all()
+        if options['artist']:
+            queryset = queryset.filter(artist_id=options['artist'])
+
+        if path == '-':
+            catalog_io.export_products(sys.stdout, fmt, queryset)
+            return
+        
+        started = time.monotonic()
+        with open(path, 'w', newline='', encoding='utf-8') as fileobj:
+            written = catalog_io.export_products(fileobj, fmt, queryset)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'{written} products exported to {path} in {elapsed:.1f}s'))
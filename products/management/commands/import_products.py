@@ -0,0 +1,56 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products import catalog_io
+
+
+class Command(BaseCommand):
+    help = 'Bulk import products (and their pictures) from a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or .jsonl file, or '-' for standard input")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--images-dir', help='Directory the "images" column is relative to')
+        parser.add_argument('--artist', type=int, help='Artist id for rows without an "artist" column')
+        parser.add_argument('--chunk-size', type=int, default=catalog_io.DEFAULT_CHUNK_SIZE, help='Rows per bulk insert')
+        parser.add_argument('--workers', type=int, default=8, help='Threads copying picture files')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or catalog_io.detect_format(path)
+        started = time.monotonic()
+
+        def report(event, **data):
+            if event == 'rejected':
+                self.stderr.write(f"line {data['line']}: {data['errors']}")
+            elif event == 'missing_image':
+                self.stderr.write(f"{data['product']}: {data['error']}")
+            elif event == 'chunk' and options['verbosity'] > 1:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"{data['products']} products ({data['products'] / elapsed:.0f}/s)")
+
+        importer = catalog_io.Importer(
+            images_dir=options['images_dir'],
+            default_artist=options['artist'],
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            report=report,
+        )
+        try:
+            if path == '-':
+                products, pictures, rejected = importer.run(catalog_io.read_rows(sys.stdin, fmt))
+            else:
+                with open(path, newline='', encoding='utf-8') as fileobj:
+                    products, pictures, rejected = importer.run(catalog_io.read_rows(fileobj, fmt))
+        except OSError as e:
+            raise CommandError(e)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{products} products and {pictures} pictures imported, {rejected} rows rejected '
+            f'in {elapsed:.1f}s ({products / elapsed if elapsed else 0:.0f} products/s)'
+        ))
+        if pictures:
+            self.stdout.write('Run build_image_derivatives to create the responsive image sizes.')
@@ -0,0 +1,42 @@
+import time
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from products import videos
+
+
+class Command(BaseCommand):
+    help = 'Build poster frames, renditions and previews for existing product and post videos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Reprocess videos that are already done')
+
+    def handle(self, *args, **options):
+        if not videos.supports_processing(default_storage):
+            self.stdout.write(self.style.WARNING('Media is not on local storage; videos are transcoded by the CDN.'))
+            return
+        if not videos.available():
+            raise CommandError(f'{videos.FFMPEG} and {videos.FFPROBE} must be installed (or set FFMPEG_BINARY / FFPROBE_BINARY).')
+
+        started = time.monotonic()
+        processed = skipped = failed = 0
+        for model_label, field_name in videos.VIDEO_FIELDS:
+            model = apps.get_model(model_label)
+            for instance in model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True}).iterator():
+                name = getattr(instance, field_name).name
+                try:
+                    if videos.process_video(instance, field_name, force=options['force']):
+                        processed += 1
+                        self.stdout.write(name)
+                    else:
+                        skipped += 1
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'{name}: {e}'))
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{processed} videos processed, {skipped} already up to date, {failed} failed in {elapsed:.1f}s'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from products import search
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all products'
+
+    def handle(self, *args, **options):
+        engine = search.backend()
+        if engine is None:
+            self.stdout.write(self.style.WARNING('No full-text backend for this database; search uses icontains.'))
+            return
+
+        search.rebuild_index()
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {Product.objects.count()} products ({engine})')
+        )
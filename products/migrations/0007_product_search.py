@@ -0,0 +1,48 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE products_product ADD COLUMN search_vector tsvector')
+        schema_editor.execute(
+            'CREATE INDEX products_product_search_vector_gin ON products_product USING gin (search_vector)'
+        )
+        schema_editor.execute(
+            "UPDATE products_product SET search_vector = "
+            "setweight(to_tsvector('simple', coalesce(products_product.name, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(artists_artist.name, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(products_product.description, '')), 'B') "
+            "FROM artists_artist WHERE artists_artist.id = products_product.artist_id"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE products_product_fts USING fts5('
+            "name, description, artist_name, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            'INSERT INTO products_product_fts (rowid, name, description, artist_name) '
+            'SELECT products_product.id, products_product.name, products_product.description, artists_artist.name '
+            'FROM products_product JOIN artists_artist ON artists_artist.id = products_product.artist_id'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS products_product_search_vector_gin')
+        schema_editor.execute('ALTER TABLE products_product DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS products_product_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_video'),
+        ('artists', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_main_picture(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Picture = apps.get_model('products', 'Picture')
+    first_picture = Picture.objects.filter(product=models.OuterRef('pk')).order_by('-is_main', 'created_at', 'pk')
+    Product.objects.update(main_picture=models.Subquery(first_picture.values('pk')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='main_picture',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.picture'),
+        ),
+        migrations.RunPython(backfill_main_picture, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_related_product'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='video_duration',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='video duration'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='video_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='video height'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='video_processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='video processed at'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='video_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='video width'),
+        ),
+    ]
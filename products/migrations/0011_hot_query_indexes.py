@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0002_initial'),
+        ('categories', '0001_initial'),
+        ('products', '0010_video_metadata'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['available', '-created_at'], name='product_available_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['available', 'craft_category', '-created_at'], name='product_available_craft_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['artist', 'available'], name='product_artist_available_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 06:45
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_effective_price(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Product.objects.update(effective_price=Coalesce('discount_price', 'price'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='effective price'),
+        ),
+        migrations.RunPython(backfill_effective_price, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['available', 'effective_price'], name='product_available_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['available', 'craft_category', 'effective_price'], name='product_craft_price_idx'),
+        ),
+    ]
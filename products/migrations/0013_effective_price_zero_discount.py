@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+def recompute_effective_price(apps, schema_editor):
+    """A discount price of 0 means no discount, as the product pages always showed it"""
+    Product = apps.get_model('products', 'Product')
+    Product.objects.filter(discount_price__lte=0).update(effective_price=models.F('price'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_product_effective_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_effective_price, migrations.RunPython.noop),
+    ]
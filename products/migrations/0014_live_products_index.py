@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 07:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('artists', '0002_initial'),
+        ('categories', '0001_initial'),
+        ('products', '0013_effective_price_zero_discount'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('available', True)), fields=['-created_at'], name='product_live_created_idx'),
+        ),
+    ]
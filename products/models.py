@@ -6,7 +6,35 @@ from categories.models import Category
 from artists.models import Artist
 import os
 
+# A discount price of 0 (or none) means no discount: the product sells at its price
+ON_DISCOUNT = models.Q(discount_price__gt=0)
+
 # Create your models here.
+class ProductQuerySet(models.QuerySet):
+    def with_card_data(self):
+        """Everything a product card renders (artist, main picture) in the same query"""
+        return self.select_related('artist', 'main_picture')
+    
+    def refresh_main_pictures(self):
+        """Re-point main_picture at each product's first picture, in one UPDATE"""
+        first_picture = Picture.objects.filter(product=models.OuterRef('pk')).order_by(*Picture._meta.ordering, 'pk')
+        return self.update(main_picture=models.Subquery(first_picture.values('pk')[:1]))
+    
+    def refresh_effective_prices(self):
+        """Recompute effective_price after price changes made with update()"""
+        return self.update(effective_price=models.Case(
+            models.When(ON_DISCOUNT, then=models.F('discount_price')), default=models.F('price'),
+        ))
+    
+    def count_by_craft_category(self):
+        """{craft_category: product count} in a single GROUP BY"""
+        rows = self.order_by().values_list('craft_category').annotate(count=models.Count('pk'))
+        return dict(rows)
+    
+    def bought_with(self, product):
+        """Precomputed "customers also bought" neighbours of a product, best first"""
+        return self.filter(related_to__product=product).order_by('related_to__rank')
+
 class Product(models.Model):
     CRAFT_CHOICES = (
         ('traditional', _('Traditional')),
@@ -25,6 +53,8 @@ class Product(models.Model):
     description = models.TextField(_('description'))
     price = models.DecimalField(_('price'), max_digits=10, decimal_places=2)
     discount_price = models.DecimalField(_('discount price'), max_digits=10, decimal_places=2, null=True, blank=True)
+    # What a buyer pays (discount price when set, else price), kept by save() for SQL sorting and sums
+    effective_price = models.DecimalField(_('effective price'), max_digits=10, decimal_places=2, default=0, editable=False)
     category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='products', null=True, blank=True)
     artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name='products')
     craft_category = models.CharField(_('craft category'), max_length=20, choices=CRAFT_CHOICES, blank=True)
@@ -34,11 +64,32 @@ class Product(models.Model):
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
     video = models.FileField(_('video'), upload_to='product_videos', blank=True, null=True)
+    # Filled in by products.videos once the video has been processed
+    video_duration = models.FloatField(_('video duration'), null=True, blank=True, editable=False)
+    video_width = models.PositiveIntegerField(_('video width'), null=True, blank=True, editable=False)
+    video_height = models.PositiveIntegerField(_('video height'), null=True, blank=True, editable=False)
+    video_processed_at = models.DateTimeField(_('video processed at'), null=True, blank=True, editable=False)
+    # Denormalized pointer to the picture shown on cards, maintained by Picture save/delete
+    main_picture = models.ForeignKey('Picture', on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='+')
+    
+    objects = ProductQuerySet.as_manager()
     
     class Meta:
         verbose_name = _('product')
         verbose_name_plural = _('products')
         ordering = ['-created_at']
+        indexes = [
+            # Storefront listings: available products, newest first, optionally by craft
+            models.Index(fields=['available', '-created_at'], name='product_available_created_idx'),
+            models.Index(fields=['available', 'craft_category', '-created_at'], name='product_available_craft_idx'),
+            models.Index(fields=['artist', 'available'], name='product_artist_available_idx'),
+            # The same for SQLite, whose planner can't match a bare "WHERE available" to
+            # the indexes above but does use an index with that very condition
+            models.Index(fields=['-created_at'], name='product_live_created_idx', condition=models.Q(available=True)),
+            # Sorting and price ranges on the price actually paid
+            models.Index(fields=['available', 'effective_price'], name='product_available_price_idx'),
+            models.Index(fields=['available', 'craft_category', 'effective_price'], name='product_craft_price_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -46,8 +97,15 @@ class Product(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        self.refresh_effective_price()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'price', 'discount_price'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'effective_price'}
         super().save(*args, **kwargs)
     
+    def refresh_effective_price(self):
+        self.effective_price = self.discount_price or self.price
+    
     def get_absolute_url(self):
         from django.urls import reverse
         return reverse('products:product_detail', kwargs={'slug': self.slug})
@@ -68,7 +126,7 @@ class Product(models.Model):
     
     @property
     def main_image(self):
-        return self.images.first()
+        return self.main_picture
 
 class Picture(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
@@ -85,3 +143,21 @@ class Picture(models.Model):
     
     def __str__(self):
         return f"Image for {self.product.name}"
+
+class RelatedProduct(models.Model):
+    """Top co-purchased products per product, rebuilt by the build_related_products command"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_to')
+    rank = models.PositiveSmallIntegerField(_('rank'))
+    score = models.FloatField(_('score'))
+    
+    class Meta:
+        verbose_name = _('related product')
+        verbose_name_plural = _('related products')
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='unique_related_product_rank'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} (#{self.rank})"
@@ -0,0 +1,122 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by the sort key of the last row seen instead of an
+offset, so page 50 costs the same single indexed range scan as page 1 and
+no ``COUNT(*)`` is ever run. Cursors are signed, opaque tokens; a missing or
+tampered cursor simply yields the first page.
+"""
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+CURSOR_SALT = 'products.pagination'
+DEFAULT_ORDERING = ('-created_at', '-id')
+
+
+class CursorPage:
+    """One page of results, iterable like a ``Paginator`` page"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Paginate ``queryset`` by the unique ``ordering`` keys.
+
+    ``ordering`` must end with a unique column (the default is
+    ``('-created_at', '-id')``) and may name annotations such as a search
+    rank as well as model fields.
+    """
+
+    def __init__(self, queryset, per_page, ordering=DEFAULT_ORDERING):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.keys = [key.lstrip('-') for key in self.ordering]
+
+    def _encode(self, obj, direction):
+        values = [getattr(obj, key) for key in self.keys]
+        values = [
+            value.isoformat() if hasattr(value, 'isoformat')
+            else value if isinstance(value, (int, float, str, type(None)))
+            else str(value)  # Decimal, UUID: parsed back by the field's to_python()
+            for value in values
+        ]
+        return signing.dumps([direction, values], salt=CURSOR_SALT, compress=True)
+
+    def _decode(self, cursor):
+        if not cursor:
+            return None, None
+        try:
+            direction, values = signing.loads(cursor, salt=CURSOR_SALT)
+            if direction not in ('next', 'prev') or len(values) != len(self.keys):
+                raise ValueError
+            model = self.queryset.model
+            for i, key in enumerate(self.keys):
+                try:
+                    values[i] = model._meta.get_field(key).to_python(values[i])
+                except FieldDoesNotExist:
+                    pass
+        except (signing.BadSignature, ValidationError, TypeError, ValueError):
+            return None, None
+        return direction, values
+
+    def _after(self, values, reverse):
+        """Rows strictly after ``values`` in the ordering (before it when ``reverse``)"""
+        condition = Q()
+        for i, order in enumerate(self.ordering):
+            descending = order.startswith('-') != reverse
+            lookup = f'{self.keys[i]}__{"lt" if descending else "gt"}'
+            step = Q(**{lookup: values[i]})
+            for key, value in zip(self.keys[:i], values[:i]):
+                step &= Q(**{key: value})
+            condition |= step
+        return condition
+
+    def get_page(self, cursor=None):
+        direction, values = self._decode(cursor)
+        reverse = direction == 'prev'
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(order[1:] if order.startswith('-') else f'-{order}' for order in ordering)
+
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse))
+
+        # One extra row tells whether there is another page in this direction
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if more or reverse:
+                next_cursor = self._encode(rows[-1], 'next')
+            if (more and reverse) or direction == 'next':
+                previous_cursor = self._encode(rows[0], 'prev')
+        return CursorPage(rows, next_cursor, previous_cursor)
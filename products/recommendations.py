@@ -0,0 +1,85 @@
+"""
+"Customers also bought" neighbours from purchase history.
+
+Orders (and optionally live carts) are turned into a sparse basket x product
+incidence matrix ``B``; ``B.T @ B`` counts how many baskets contain each
+pair of products. Counts are normalised to cosine similarity so best sellers
+don't become everyone's neighbour, and the top K per product are written to
+``RelatedProduct``. Run offline via ``manage.py build_related_products``;
+the web process only reads the stored rows.
+"""
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+
+from cart.models import CartItem
+from orders.models import OrderItem
+from . import catalog_cache
+from .models import RelatedProduct
+
+TOP_K = 12
+
+
+def _baskets(include_carts):
+    """Distinct (basket, product id) pairs; cart baskets are kept apart from orders"""
+    pairs = set(OrderItem.objects.values_list('order_id', 'product_id'))
+    if include_carts:
+        pairs.update((f'cart-{cart_id}', product_id) for cart_id, product_id in CartItem.objects.values_list('cart_id', 'product_id'))
+    return pairs
+
+
+def co_purchase_matrix(pairs):
+    """Return (product ids, cosine similarity matrix) for the given baskets"""
+    pairs = list(pairs)
+    basket_index, product_index = {}, {}
+    rows = np.fromiter((basket_index.setdefault(basket, len(basket_index)) for basket, _product in pairs), dtype=np.int32, count=len(pairs))
+    cols = np.fromiter((product_index.setdefault(product, len(product_index)) for _basket, product in pairs), dtype=np.int32, count=len(pairs))
+    incidence = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.float32), (rows, cols)),
+        shape=(len(basket_index), len(product_index)),
+    )
+
+    co_counts = (incidence.T @ incidence).tocsr()
+    # Diagonal = number of baskets containing each product
+    support = np.sqrt(co_counts.diagonal())
+    co_counts.setdiag(0)
+    co_counts.eliminate_zeros()
+    norm = sparse.diags(1 / np.where(support > 0, support, 1))
+    similarity = (norm @ co_counts @ norm).tocsr()
+    return list(product_index), similarity
+
+
+def top_neighbours(similarity, k):
+    """Yield (row, [(column, score), ...]) with the k best scores of every row"""
+    for row in range(similarity.shape[0]):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        if start == end:
+            continue
+        columns = similarity.indices[start:end]
+        scores = similarity.data[start:end]
+        if len(scores) > k:
+            best = np.argpartition(-scores, k - 1)[:k]
+            columns, scores = columns[best], scores[best]
+        order = np.lexsort((columns, -scores))
+        yield row, [(int(columns[i]), float(scores[i])) for i in order]
+
+
+def build_related_products(k=TOP_K, include_carts=False, batch_size=1000):
+    """Recompute and store every product's neighbours. Returns (products, rows) written."""
+    pairs = _baskets(include_carts)
+    if not pairs:
+        with transaction.atomic():
+            RelatedProduct.objects.all().delete()
+        return 0, 0
+
+    product_ids, similarity = co_purchase_matrix(pairs)
+    links = [
+        RelatedProduct(product_id=product_ids[row], related_id=product_ids[column], rank=rank, score=score)
+        for row, neighbours in top_neighbours(similarity, k)
+        for rank, (column, score) in enumerate(neighbours)
+    ]
+    with transaction.atomic():
+        RelatedProduct.objects.all().delete()
+        RelatedProduct.objects.bulk_create(links, batch_size=batch_size)
+    catalog_cache.bump_version()
+    return len({link.product_id for link in links}), len(links)
@@ -0,0 +1,163 @@
+"""
+Full-text product search.
+
+Postgres (Render) keeps a weighted ``tsvector`` column on ``products_product``
+behind a GIN index; SQLite (local / PythonAnywhere) keeps an FTS5 shadow table
+keyed by product id. Both are created by migration 0007 and kept in sync by the
+signal handlers in ``products.signals``. Any other backend falls back to the
+old ``icontains`` filters, unranked.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, TextField
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+FTS_TABLE = 'products_product_fts'
+
+# Private-use characters delimit highlighted terms so the snippet can be
+# HTML-escaped before the <mark> tags are put in.
+MARK_START = '\ue000'
+MARK_STOP = '\ue001'
+
+# Keyset ordering of ranked results (see products.pagination)
+RANK_ORDERING = ('-search_rank', '-created_at', '-id')
+
+# Column weights: product name, description, artist name
+SQLITE_WEIGHTS = (10.0, 1.0, 4.0)
+
+
+def backend():
+    """Return the search backend available on the default connection"""
+    if connection.vendor in ('postgresql', 'sqlite'):
+        return connection.vendor
+    return None
+
+
+def _tokens(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def search(queryset, query, ordering):
+    """
+    Filter a Product queryset down to matches for ``query``, best first.
+    Returns ``(queryset, ordering)``: ``RANK_ORDERING`` when the results are
+    ranked, else the ``ordering`` passed in.
+
+    Matching products are annotated with ``search_rank`` (higher is better)
+    and ``search_snippet`` (raw text, see ``highlight``). Every term is
+    prefix-matched and all terms must match. The rank is a real annotation,
+    so it can be filtered on for keyset pagination. A query without any
+    word (``-``, ``"'*``) leaves the queryset as it is.
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return queryset, ordering
+
+    engine = backend()
+    if engine == 'postgresql':
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        headline_options = f'StartSel={MARK_START}, StopSel={MARK_STOP}, MaxWords=24, MinWords=8'
+        queryset = queryset.extra(
+            where=["products_product.search_vector @@ to_tsquery('simple', %s)"],
+            params=[tsquery],
+        ).annotate(
+            # float8: the keyset cursor carries the rank as a Python float, and
+            # comparing that against a float4 misses or repeats ties at page edges
+            search_rank=RawSQL(
+                "ts_rank_cd(products_product.search_vector, to_tsquery('simple', %s))::float8",
+                (tsquery,), output_field=FloatField(),
+            ),
+            search_snippet=RawSQL(
+                "ts_headline('simple', products_product.description, to_tsquery('simple', %s), %s)",
+                (tsquery, headline_options), output_field=TextField(),
+            ),
+        ).order_by('-search_rank', '-created_at')
+        return queryset, RANK_ORDERING
+
+    if engine == 'sqlite':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        queryset = queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = products_product.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        ).annotate(
+            search_rank=RawSQL(f'-bm25({FTS_TABLE}, %s, %s, %s)', SQLITE_WEIGHTS, output_field=FloatField()),
+            search_snippet=RawSQL(
+                f"snippet({FTS_TABLE}, -1, %s, %s, '…', 16)",
+                (MARK_START, MARK_STOP), output_field=TextField(),
+            ),
+        ).order_by('-search_rank', '-created_at')
+        return queryset, RANK_ORDERING
+
+    # Other backends: unranked
+    return queryset.filter(
+        Q(name__icontains=query) |
+        Q(description__icontains=query) |
+        Q(artist__name__icontains=query)
+    ), ordering
+
+
+def highlight(snippet):
+    """Turn a raw search snippet into safe HTML with <mark> around matches"""
+    if not snippet:
+        return ''
+    return mark_safe(escape(snippet).replace(MARK_START, '<mark>').replace(MARK_STOP, '</mark>'))
+
+
+def _reindex(where, params):
+    engine = backend()
+    with connection.cursor() as cursor:
+        if engine == 'postgresql':
+            cursor.execute(
+                "UPDATE products_product SET search_vector = "
+                "setweight(to_tsvector('simple', coalesce(products_product.name, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(artists_artist.name, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(products_product.description, '')), 'B') "
+                "FROM artists_artist "
+                f"WHERE artists_artist.id = products_product.artist_id AND {where}",
+                params,
+            )
+        elif engine == 'sqlite':
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT id FROM products_product WHERE {where})', params)
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, description, artist_name) '
+                'SELECT products_product.id, products_product.name, products_product.description, artists_artist.name '
+                'FROM products_product JOIN artists_artist ON artists_artist.id = products_product.artist_id '
+                f'WHERE {where}',
+                params,
+            )
+
+
+def index_product(product_id):
+    """Refresh the search document of a single product"""
+    _reindex('products_product.id = %s', [product_id])
+
+
+def index_products(product_ids):
+    """Refresh the search documents of many products (after a bulk insert)"""
+    if product_ids:
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        _reindex(f'products_product.id IN ({placeholders})', list(product_ids))
+
+
+def index_artist_products(artist_id):
+    """Refresh the search documents of every product by an artist"""
+    _reindex('products_product.artist_id = %s', [artist_id])
+
+
+def unindex_product(product_id):
+    """Drop a deleted product from the shadow table (Postgres drops it with the row)"""
+    if backend() == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [product_id])
+
+
+def rebuild_index():
+    """Rebuild the search documents of every product"""
+    if backend() == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    _reindex('1 = 1', [])
@@ -0,0 +1,192 @@
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from artists.models import Artist
+from .models import Product, Picture
+from . import autocomplete, catalog_cache, counts, images, search, videos
+
+
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, raw=False, **kwargs):
+    """Keep the product's search document in sync with its text fields"""
+    if not raw:
+        search.index_product(instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    search.unindex_product(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def update_product_suggestions(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.index.update_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_suggestions(sender, instance, **kwargs):
+    autocomplete.index.remove_product(instance.pk)
+
+
+@receiver(post_save, sender=Artist)
+def update_artist_suggestions(sender, instance, raw=False, **kwargs):
+    if not raw:
+        autocomplete.index.update_artist(instance)
+
+
+@receiver(post_delete, sender=Artist)
+def remove_artist_suggestions(sender, instance, **kwargs):
+    autocomplete.index.remove_artist(instance.pk)
+
+
+def _counted_state(instance):
+    # Read from __dict__ so deferred fields are never loaded just for this
+    return instance.__dict__.get('available'), instance.__dict__.get('craft_category')
+
+
+@receiver(post_init, sender=Product)
+def remember_counted_state(sender, instance, **kwargs):
+    instance._counted_state = _counted_state(instance)
+
+
+@receiver(post_save, sender=Product)
+def invalidate_craft_counts_on_save(sender, instance, created=False, raw=False, **kwargs):
+    """Craft category counts only change with availability or craft type"""
+    state = _counted_state(instance)
+    if created or state != instance._counted_state:
+        counts.invalidate_craft_category_counts()
+    instance._counted_state = state
+
+
+@receiver(post_delete, sender=Product)
+def invalidate_craft_counts_on_delete(sender, instance, **kwargs):
+    counts.invalidate_craft_category_counts()
+
+
+@receiver(post_save, sender=Artist)
+def index_artist_products(sender, instance, created=False, raw=False, **kwargs):
+    """Artist names are part of each product's search document"""
+    if not raw and not created:
+        search.index_artist_products(instance.pk)
+
+
+@receiver(post_save, sender=Picture)
+@receiver(post_delete, sender=Picture)
+def refresh_main_picture(sender, instance, raw=False, **kwargs):
+    """Keep Product.main_picture pointing at the product's first picture"""
+    if not raw:
+        Product.objects.filter(pk=instance.product_id).refresh_main_pictures()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Picture)
+@receiver(post_delete, sender=Picture)
+@receiver(post_save, sender=Artist)
+@receiver(post_delete, sender=Artist)
+def bump_catalog_version(sender, raw=False, **kwargs):
+    """Retire every cached catalog page and queryset"""
+    if not raw:
+        # After commit: a request reading the old rows meanwhile would cache them under the new version
+        transaction.on_commit(catalog_cache.bump_version)
+
+
+def _stored_name(instance, field_name):
+    # A str until the field is first accessed, a FieldFile after; never loads deferred fields
+    value = instance.__dict__.get(field_name)
+    return getattr(value, 'name', value) or ''
+
+
+def _stored_name_receiver(field_name):
+    def remember_stored_name(sender, instance, **kwargs):
+        setattr(instance, f'_stored_{field_name}', _stored_name(instance, field_name))
+    return remember_stored_name
+
+
+def _derivatives_receiver(field_name):
+    def build_derivatives(sender, instance, raw=False, update_fields=None, **kwargs):
+        """Resize freshly uploaded images into their responsive variants and drop the replaced ones"""
+        if raw or (update_fields is not None and field_name not in update_fields):
+            return
+        fieldfile = getattr(instance, field_name)
+        stored = getattr(instance, f'_stored_{field_name}', '')
+        if stored and stored != fieldfile.name:
+            images.schedule_deletion(stored, fieldfile.storage)
+        setattr(instance, f'_stored_{field_name}', fieldfile.name or '')
+        images.schedule_derivatives(fieldfile)
+    return build_derivatives
+
+
+def _deleted_image_receiver(field_name):
+    def delete_derivatives(sender, instance, **kwargs):
+        stored = getattr(instance, f'_stored_{field_name}', '')
+        images.schedule_deletion(stored, sender._meta.get_field(field_name).storage)
+    return delete_derivatives
+
+
+for model_label, field_name in images.IMAGE_FIELDS:
+    model = apps.get_model(model_label)
+    post_init.connect(
+        _stored_name_receiver(field_name),
+        sender=model,
+        weak=False,
+        dispatch_uid=f'image_stored_{model_label}_{field_name}',
+    )
+    post_save.connect(
+        _derivatives_receiver(field_name),
+        sender=model,
+        weak=False,
+        dispatch_uid=f'image_derivatives_{model_label}_{field_name}',
+    )
+    post_delete.connect(
+        _deleted_image_receiver(field_name),
+        sender=model,
+        weak=False,
+        dispatch_uid=f'image_derivatives_delete_{model_label}_{field_name}',
+    )
+
+
+def _video_receiver(field_name):
+    def process_video(sender, instance, raw=False, update_fields=None, **kwargs):
+        """Transcode freshly uploaded videos, extract their poster frame and drop the replaced outputs"""
+        if raw or (update_fields is not None and field_name not in update_fields):
+            return
+        fieldfile = getattr(instance, field_name)
+        stored = getattr(instance, f'_stored_{field_name}', '')
+        if stored and stored != fieldfile.name:
+            videos.schedule_deletion(stored, fieldfile.storage)
+        setattr(instance, f'_stored_{field_name}', fieldfile.name or '')
+        videos.schedule_processing(instance, field_name)
+    return process_video
+
+
+def _deleted_video_receiver(field_name):
+    def delete_outputs(sender, instance, **kwargs):
+        stored = getattr(instance, f'_stored_{field_name}', '')
+        videos.schedule_deletion(stored, sender._meta.get_field(field_name).storage)
+    return delete_outputs
+
+
+for model_label, field_name in videos.VIDEO_FIELDS:
+    model = apps.get_model(model_label)
+    post_init.connect(
+        _stored_name_receiver(field_name),
+        sender=model,
+        weak=False,
+        dispatch_uid=f'video_stored_{model_label}_{field_name}',
+    )
+    post_save.connect(
+        _video_receiver(field_name),
+        sender=model,
+        weak=False,
+        dispatch_uid=f'video_processing_{model_label}_{field_name}',
+    )
+    post_delete.connect(
+        _deleted_video_receiver(field_name),
+        sender=model,
+        weak=False,
+        dispatch_uid=f'video_outputs_delete_{model_label}_{field_name}',
+    )
@@ -0,0 +1,55 @@
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from products import images
+
+register = template.Library()
+
+# Product grids: one column on phones, two on tablets, four on desktop
+CARD_SIZES = '(max-width: 576px) 100vw, (max-width: 992px) 50vw, 25vw'
+
+
+def _srcset(fieldfile, ext):
+    return ', '.join(f'{url} {width}w' for width, url in images.derivative_urls(fieldfile, ext))
+
+
+@register.simple_tag
+def picture(fieldfile, sizes=CARD_SIZES, **attrs):
+    """
+    Render an image field as a lazy-loaded <picture> with WebP and JPEG srcsets.
+
+    Extra keyword arguments (alt, class, style, width, height...) become
+    attributes of the inner <img>. Images without derivatives yet are
+    rendered as a plain lazy <img> of the original.
+    """
+    if not fieldfile:
+        return ''
+    attrs.setdefault('loading', 'lazy')
+    attrs.setdefault('decoding', 'async')
+
+    if not images.has_derivatives(fieldfile):
+        return format_html('<img src="{}"{}>', fieldfile.url, flatatt(attrs))
+
+    fallback = images.derivative_urls(fieldfile, 'jpg')[-2][1]
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        _srcset(fieldfile, 'webp'), sizes,
+        fallback, _srcset(fieldfile, 'jpg'), sizes, flatatt(attrs),
+    )
+
+
+@register.filter
+def derivative_url(fieldfile, width):
+    """URL of the smallest JPEG derivative at least ``width`` pixels wide (for fixed-size slots)"""
+    if not fieldfile:
+        return ''
+    if not images.has_derivatives(fieldfile):
+        return fieldfile.url
+    width = int(width)
+    urls = images.derivative_urls(fieldfile, 'jpg')
+    for derivative_width, url in urls:
+        if derivative_width >= width:
+            return url
+    return urls[-1][1]
@@ -0,0 +1,51 @@
+import mimetypes
+
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html, format_html_join
+from django.utils.translation import gettext as _
+
+from products import videos
+
+register = template.Library()
+
+
+@register.simple_tag
+def video(instance, field_name='video', preview=False, **attrs):
+    """
+    Render a model's video as a <video> that downloads nothing until played.
+
+    Processed videos get their poster frame, size and the WebM/MP4
+    renditions; unprocessed ones fall back to the original upload. With
+    ``preview=True`` the short muted preview clip is used instead (for
+    thumbnails). Extra keyword arguments become attributes of <video>;
+    ``True`` renders a bare attribute such as ``controls`` and underscores
+    become dashes (``data_type`` -> ``data-type``).
+    """
+    fieldfile = getattr(instance, field_name)
+    if not fieldfile:
+        return ''
+    # data_type="video" -> data-type="video"
+    attrs = {name.replace('_', '-'): value for name, value in attrs.items()}
+    attrs.setdefault('preload', 'none')
+    outputs = videos.renditions(instance, field_name)
+
+    if outputs:
+        attrs.setdefault('poster', outputs['poster'])
+        if instance.video_width and instance.video_height:
+            attrs.setdefault('width', instance.video_width)
+            attrs.setdefault('height', instance.video_height)
+        if preview:
+            sources = [(outputs['preview'], 'video/mp4')]
+            attrs.update(muted=True, loop=True, playsinline=True)
+        else:
+            sources = [(outputs['webm'], 'video/webm'), (outputs['mp4'], 'video/mp4')]
+    else:
+        sources = [(fieldfile.url, mimetypes.guess_type(fieldfile.name)[0] or 'video/mp4')]
+
+    return format_html(
+        '<video{}>{}{}</video>',
+        flatatt(attrs),
+        format_html_join('', '<source src="{}" type="{}">', sources),
+        _('Your browser does not support the video tag.'),
+    )
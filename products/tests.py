@@ -1,3 +1,162 @@
-from django.test import TestCase
-
-# Create your tests here.
+import tempfile
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from artists.models import Artist
+from chatbot.models import ChatMessage, ChatSession
+from community.models import Message, Notification, Post
+
+from . import videos
+from .management.commands.check_query_plans import PLAN_VENDORS, full_scans, hot_pages
+from .models import Product
+
+
+def create_catalog(products=3):
+    """An artist with a few available products, one of them featured"""
+    user = get_user_model().objects.create_user(username='artist', email='artist@example.com', role='artist', wilaya='algiers')
+    artist = Artist.objects.create(user=user, name='Artist')
+    for i in range(products):
+        Product.objects.create(
+            artist=artist, name=f'Product {i}', slug=f'product-{i}', description='Handmade',
+            price=1000 + i, craft_category='clothing', stock=5, featured=i == 0,
+        )
+    return artist
+
+
+# Cached pages would hide their queries
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}, SECURE_SSL_REDIRECT=False)
+@skipUnless(connection.vendor in PLAN_VENDORS, f'No query plan support for {connection.vendor}')
+class QueryPlanTests(TestCase):
+    """The busiest pages read the large tables through an index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        artist = create_catalog()
+        cls.user = get_user_model().objects.create_user(username='buyer', email='buyer@example.com', wilaya='oran')
+        post = Post.objects.create(author=artist.user, title='Weaving', content='A new rug')
+        message = Message.objects.create(sender=artist.user, recipient=cls.user, content='Hello')
+        Notification.objects.create(recipient=cls.user, sender=artist.user, notification_type='message', message='Hello', message_obj=message)
+        Notification.objects.create(recipient=cls.user, sender=artist.user, notification_type='like', message='Liked', post=post)
+        session = ChatSession.objects.create(session_id='plan-check')
+        ChatMessage.objects.create(session=session, message_type='user', content='Hi')
+
+    def test_hot_pages_use_indexes(self):
+        self.client.force_login(self.user)
+        for label, url, logged_in in hot_pages():
+            with self.subTest(page=label):
+                client = self.client if logged_in else Client()
+                with CaptureQueriesContext(connection) as captured:
+                    response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                for query in captured.captured_queries:
+                    if query['sql'].lstrip().upper().startswith('SELECT'):
+                        self.assertEqual(full_scans(query['sql']), set(), query['sql'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}, SECURE_SSL_REDIRECT=False)
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+
+    def test_ranked_search(self):
+        response = self.client.get(reverse('products:product_search'), {'q': 'prod'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_query_without_words_lists_everything(self):
+        # Nothing to match or rank on: the unranked, newest first listing
+        for query in ('-', '"\'*', ' '):
+            with self.subTest(query=query):
+                response = self.client.get(reverse('products:product_search'), {'q': query})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['page_obj']), 3)
+                response = self.client.get(reverse('products:product_feed'), {'q': query})
+                self.assertEqual(response.status_code, 200)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class APIQueryBudgetTests(TestCase):
+    """Every catalog API endpoint runs a fixed number of queries, 304 revalidations included"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artist = create_catalog(products=5)
+        cls.product = cls.artist.products.first()
+
+    def setUp(self):
+        cache.clear()
+        # Warm the catalog version and craft counts, as in production
+        self.client.get(reverse('api:craft_category_list'))
+
+    def assertQueryBudget(self, url, full, revalidation):
+        """``full`` queries for the response, ``revalidation`` for a 304 on its ETag"""
+        with self.assertNumQueries(full):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        with self.assertNumQueries(revalidation):
+            not_modified = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        return response
+
+    def test_product_list(self):
+        # The page with artist and main picture joined, then all pictures
+        response = self.assertQueryBudget(reverse('api:product_list') + '?limit=100', 2, 1)
+        self.assertEqual(len(response.json()['results']), 5)
+
+    def test_product_search_without_words(self):
+        # Nothing to rank on: the unfiltered list, newest first
+        response = self.assertQueryBudget(reverse('api:product_list') + '?limit=100&q=-', 2, 1)
+        self.assertEqual(len(response.json()['results']), 5)
+
+    def test_product_detail(self):
+        self.assertQueryBudget(reverse('api:product_detail', args=[self.product.slug]), 2, 1)
+
+    def test_artist_list(self):
+        # Product counts are an annotation
+        self.assertQueryBudget(reverse('api:artist_list') + '?limit=100', 1, 1)
+
+    def test_artist_detail(self):
+        self.assertQueryBudget(reverse('api:artist_detail', args=[self.artist.pk]), 1, 1)
+
+    def test_craft_category_list(self):
+        # Counts come from the cache
+        self.assertQueryBudget(reverse('api:craft_category_list'), 0, 0)
+
+    def test_etag_changes_when_a_product_leaves_the_catalog(self):
+        url = reverse('api:product_list')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.available = False
+            self.product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 4)
+
+
+class VideoOutputTests(SimpleTestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.storage = FileSystemStorage(location=media.name)
+
+    def test_sources_sharing_a_stem_keep_their_own_outputs(self):
+        sources = ('product_videos/clip.mp4', 'product_videos/clip.mov')
+        names = [{videos.output_name(source, kind) for kind in videos.OUTPUTS} for source in sources]
+        self.assertEqual(len(names[0]), len(videos.OUTPUTS))
+        self.assertFalse(names[0] & names[1])
+
+        for name in names[0] | names[1]:
+            self.storage.save(name, ContentFile(b'video'))
+        videos.delete_outputs(sources[0], self.storage)
+        self.assertFalse(any(self.storage.exists(name) for name in names[0]))
+        self.assertTrue(all(self.storage.exists(name) for name in names[1]))
@@ -7,4 +7,6 @@ urlpatterns = [
     path('', views.product_list, name='product_list'),
     path('product/<slug:slug>/', views.product_detail, name='product_detail'),
     path('search/', views.product_search, name='product_search'),
+    path('feed/', views.product_feed, name='product_feed'),
+    path('autocomplete/', views.product_autocomplete, name='product_autocomplete'),
 ]
@@ -0,0 +1,212 @@
+"""
+Background video processing.
+
+Uploaded product and post videos are run through ffmpeg once, after the
+upload is committed. That produces a JPEG poster frame, H.264/MP4 and
+VP9/WebM renditions capped at ``MAX_HEIGHT`` and ``MAX_BITRATE``, and a
+short muted preview clip. The outputs sit next to the original under
+``_r/`` with names derived from the original file name, extension included
+(``clip.mp4-720.mp4``), and the duration and dimensions are written to the
+model. Like image derivatives, this only runs on local storage; Cloudinary
+transcodes on its own CDN. Without ffmpeg on the PATH (or
+``settings.FFMPEG_BINARY``) uploads are served as-is.
+"""
+import json
+import logging
+import os
+import posixpath
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils import timezone
+
+from . import catalog_cache
+
+logger = logging.getLogger(__name__)
+
+FFMPEG = getattr(settings, 'FFMPEG_BINARY', 'ffmpeg')
+FFPROBE = getattr(settings, 'FFPROBE_BINARY', 'ffprobe')
+
+RENDITION_DIR = '_r'
+MAX_HEIGHT = 720
+MAX_BITRATE = '1500k'
+PREVIEW_SECONDS = 6
+PREVIEW_HEIGHT = 360
+POSTER_AT = 1.0  # seconds into the video (clamped for shorter clips)
+TIMEOUT = 15 * 60
+
+# Video fields that are processed on upload: (app_label.Model, field name)
+VIDEO_FIELDS = (
+    ('products.Product', 'video'),
+    ('community.Post', 'video'),
+)
+
+# Suffix and extension of each output
+OUTPUTS = {
+    'poster': ('poster', 'jpg'),
+    'mp4': (str(MAX_HEIGHT), 'mp4'),
+    'webm': (str(MAX_HEIGHT), 'webm'),
+    'preview': ('preview', 'mp4'),
+}
+
+# One video at a time: transcoding already uses every core
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='videos')
+
+
+def available():
+    return shutil.which(FFMPEG) is not None and shutil.which(FFPROBE) is not None
+
+
+def supports_processing(storage):
+    return isinstance(storage, FileSystemStorage)
+
+
+def output_name(name, kind):
+    dirname, filename = posixpath.split(name)
+    suffix, ext = OUTPUTS[kind]
+    # clip.mp4 and clip.mov must not share outputs
+    return posixpath.join(dirname, RENDITION_DIR, f'{filename}-{suffix}.{ext}')
+
+
+def output_url(fieldfile, kind):
+    return fieldfile.storage.url(output_name(fieldfile.name, kind))
+
+
+def has_outputs(fieldfile):
+    return fieldfile.storage.exists(output_name(fieldfile.name, 'preview'))
+
+
+def renditions(instance, field_name='video'):
+    """{kind: url} of a processed video's outputs; empty until processing is done"""
+    fieldfile = getattr(instance, field_name)
+    if not fieldfile or not instance.video_processed_at or not supports_processing(fieldfile.storage):
+        return {}
+    if not has_outputs(fieldfile):
+        # Processed under an older naming scheme: served as uploaded until process_videos runs
+        return {}
+    return {kind: output_url(fieldfile, kind) for kind in OUTPUTS}
+
+
+def probe(path):
+    """Return (duration in seconds, width, height) of a video file"""
+    result = subprocess.run(
+        [FFPROBE, '-v', 'error', '-select_streams', 'v:0',
+         '-show_entries', 'stream=width,height:format=duration', '-of', 'json', path],
+        capture_output=True, check=True, timeout=60,
+    )
+    data = json.loads(result.stdout)
+    stream = (data.get('streams') or [{}])[0]
+    duration = float(data.get('format', {}).get('duration') or 0) or None
+    return duration, stream.get('width'), stream.get('height')
+
+
+def _scale(height):
+    # Never upscale; keep both sides even as the encoders require
+    return f"scale=-2:'min({height},ih)'"
+
+
+def _ffmpeg(*args):
+    subprocess.run([FFMPEG, '-y', '-v', 'error', *args], capture_output=True, check=True, timeout=TIMEOUT)
+
+
+def _transcode(source, workdir, duration):
+    """Run every ffmpeg pass; returns {kind: local output path}"""
+    paths = {kind: os.path.join(workdir, f'{kind}.{ext}') for kind, (_suffix, ext) in OUTPUTS.items()}
+    poster_at = min(POSTER_AT, duration / 2) if duration else 0
+    rate = ['-b:v', MAX_BITRATE, '-maxrate', MAX_BITRATE, '-bufsize', '3000k']
+
+    _ffmpeg('-ss', f'{poster_at:.2f}', '-i', source, '-frames:v', '1', '-vf', _scale(MAX_HEIGHT), '-q:v', '3', paths['poster'])
+    _ffmpeg('-i', source, '-vf', _scale(MAX_HEIGHT), '-c:v', 'libx264', '-preset', 'medium', '-profile:v', 'main',
+            '-pix_fmt', 'yuv420p', *rate, '-c:a', 'aac', '-b:a', '128k', '-movflags', '+faststart', paths['mp4'])
+    _ffmpeg('-i', source, '-vf', _scale(MAX_HEIGHT), '-c:v', 'libvpx-vp9', '-row-mt', '1', '-deadline', 'good', '-cpu-used', '5',
+            *rate, '-c:a', 'libopus', '-b:a', '96k', paths['webm'])
+    _ffmpeg('-i', source, '-t', str(PREVIEW_SECONDS), '-an', '-vf', _scale(PREVIEW_HEIGHT), '-c:v', 'libx264',
+            '-preset', 'fast', '-pix_fmt', 'yuv420p', '-crf', '28', '-movflags', '+faststart', paths['preview'])
+    return paths
+
+
+def process_video(instance, field_name='video', force=False):
+    """Build the renditions of one model instance's video. Returns True if work was done."""
+    fieldfile = getattr(instance, field_name)
+    if not fieldfile or not supports_processing(fieldfile.storage):
+        return False
+    storage, name = fieldfile.storage, fieldfile.name
+    if not force and instance.video_processed_at and has_outputs(fieldfile):
+        return False
+
+    with tempfile.TemporaryDirectory(prefix='crafty-video-') as workdir:
+        source = os.path.join(workdir, 'source' + posixpath.splitext(name)[1])
+        with storage.open(name, 'rb') as uploaded, open(source, 'wb') as local:
+            shutil.copyfileobj(uploaded, local)
+
+        duration, width, height = probe(source)
+        outputs = _transcode(source, workdir, duration)
+
+        for kind, path in outputs.items():
+            target = output_name(name, kind)
+            if storage.exists(target):
+                storage.delete(target)
+            with open(path, 'rb') as output:
+                storage.save(target, File(output))
+
+        # Dimensions of the rendition actually served
+        _duration, width, height = probe(outputs['mp4'])
+
+    # update() rather than save(): no signals, no loop back into processing
+    type(instance).objects.filter(pk=instance.pk).update(
+        video_duration=duration,
+        video_width=width,
+        video_height=height,
+        video_processed_at=timezone.now(),
+    )
+    # Cached product pages still hold the unprocessed video
+    catalog_cache.bump_version()
+    return True
+
+
+def delete_outputs(name, storage):
+    for kind in OUTPUTS:
+        target = output_name(name, kind)
+        if storage.exists(target):
+            storage.delete(target)
+
+
+def schedule_deletion(name, storage):
+    """Delete the outputs of a replaced or deleted video once the change is committed"""
+    if not name or not supports_processing(storage):
+        return
+    transaction.on_commit(lambda: delete_outputs(name, storage))
+
+
+def _process_quietly(model, pk, field_name):
+    try:
+        instance = model.objects.get(pk=pk)
+        process_video(instance, field_name)
+    except Exception:
+        logger.exception('Could not process the video of %s %s', model.__name__, pk)
+
+
+def schedule_processing(instance, field_name='video'):
+    """Process the video in the background once the upload is committed"""
+    fieldfile = getattr(instance, field_name)
+    if not fieldfile or not supports_processing(fieldfile.storage):
+        return
+    if instance.video_processed_at and has_outputs(fieldfile):
+        return
+    if instance.video_processed_at:
+        # A new video replaced a processed one: serve the upload until it is processed
+        type(instance).objects.filter(pk=instance.pk).update(
+            video_duration=None, video_width=None, video_height=None, video_processed_at=None,
+        )
+        instance.video_processed_at = None
+    if not available():
+        logger.info('ffmpeg/ffprobe not found; %s is served unprocessed', fieldfile.name)
+        return
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: _executor.submit(_process_quietly, model, pk, field_name))
@@ -1,16 +1,28 @@
-from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator
+from django.shortcuts import render
+from django.http import Http404, JsonResponse
 from django.db.models import Q, Count
 from django.utils.translation import gettext_lazy as _
 
 from .models import Product
+from . import autocomplete, catalog_cache, search
+from .counts import craft_category_counts
+from .filters import ProductFilter, build_facets, sort_controls, sort_ordering
+from .pagination import CursorPaginator, DEFAULT_ORDERING
 from categories.models import Category
 
 # Create your views here.
 def product_list(request):
-    products = Product.objects.filter(available=True)
-    featured_products = products.filter(featured=True)[:8]
-    latest_products = products.order_by('-created_at')[:8]
+    def load():
+        products = Product.objects.filter(available=True).with_card_data()
+        return {
+            'featured': list(products.filter(featured=True)[:8]),
+            'latest': list(products.order_by('-created_at')[:8]),
+        }
+    
+    # Served from the versioned catalog cache until a product changes
+    home = catalog_cache.get_or_build(('home',), load)
+    featured_products = home['featured']
+    latest_products = home['latest']
     
     # Get all craft categories for sidebar
     craft_categories = Product.CRAFT_CHOICES
@@ -19,17 +31,29 @@ def product_list(request):
         'featured_products': featured_products,
         'latest_products': latest_products,
         'craft_categories': craft_categories,
+        'craft_products_count': craft_category_counts(),
         'title': _('Home'),
     }
     return render(request, 'products/product_list.html', context)
 
-def product_detail(request, slug):
-    product = get_object_or_404(Product, slug=slug, available=True)
+def _related_products(product):
+    # "Customers also bought", precomputed by the build_related_products command
+    related_products = list(Product.objects.bought_with(product).filter(available=True).with_card_data()[:4])
     
-    # Get related products based on craft category instead of regular category
-    related_products = []
-    if product.craft_category:
-        related_products = Product.objects.filter(craft_category=product.craft_category, available=True).exclude(id=product.id)[:4]
+    # Cold products (never ordered): fall back to the same craft category
+    if not related_products and product.craft_category:
+        related_products = list(Product.objects.filter(craft_category=product.craft_category, available=True).exclude(id=product.id).with_card_data()[:4])
+    return related_products
+
+def product_detail(request, slug):
+    # Product with its pictures, and its related products, from the versioned catalog cache
+    product = catalog_cache.get_or_build(
+        ('product', slug),
+        lambda: Product.objects.with_card_data().prefetch_related('images').filter(slug=slug, available=True).first(),
+    )
+    if product is None:
+        raise Http404
+    related_products = catalog_cache.get_or_build(('related', product.pk), lambda: _related_products(product))
     
     # Get craft category name for display
     craft_category_name = dict(Product.CRAFT_CHOICES).get(product.craft_category, '')
@@ -42,26 +66,36 @@ def product_detail(request, slug):
     }
     return render(request, 'products/product_detail.html', context)
 
-def product_search(request):
+def _search_results(request):
+    """Base queryset, filterset and keyset paginator shared by the search page and feed"""
     query = request.GET.get('q', '')
-    craft_category = request.GET.get('craft_category', '')
     
-    products = Product.objects.filter(available=True)
+    products = Product.objects.filter(available=True).with_card_data()
+    ordering = DEFAULT_ORDERING
     
+    # Ranked full-text search (best matches first)
     if query:
-        products = products.filter(
-            Q(name__icontains=query) | 
-            Q(description__icontains=query) |
-            Q(artist__name__icontains=query)
-        )
+        products, ordering = search.search(products, query, ordering)
+    
+    # Price sorting replaces relevance / newest first
+    _sort, ordering = sort_ordering(request, ordering)
     
-    if craft_category:
-        products = products.filter(craft_category=craft_category)
+    filterset = ProductFilter(request.GET, queryset=products)
+    paginator = CursorPaginator(filterset.qs, 12, ordering)  # Show 12 products per page
+    return query, products, filterset, paginator
+
+def product_search(request):
+    query, products, filterset, paginator = _search_results(request)
+    
+    # Facet filters and their counts over the search results
+    facets = build_facets(request, products, filterset)
     
     # Pagination
-    paginator = Paginator(products, 12)  # Show 12 products per page
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    
+    # Highlighted snippets for the matched products on this page
+    for product in page_obj:
+        product.search_highlight = search.highlight(getattr(product, 'search_snippet', ''))
     
     # Get all craft categories for filtering
     craft_categories = Product.CRAFT_CHOICES
@@ -69,8 +103,44 @@ def product_search(request):
     context = {
         'page_obj': page_obj,
         'query': query,
-        'selected_craft_category': craft_category,
+        'selected_craft_category': filterset.active_filters.get('craft_category', ''),
         'craft_categories': craft_categories,
+        'filterset': filterset,
+        'facets': facets,
+        'sorting': sort_controls(request, filterset, _('Relevance') if query else _('Newest')),
         'title': _('Search Results'),
     }
     return render(request, 'products/product_search.html', context)
+
+def product_autocomplete(request):
+    """Search-as-you-type suggestions from the in-process prefix index"""
+    try:
+        limit = int(request.GET.get('limit', autocomplete.MAX_RESULTS))
+    except ValueError:
+        limit = autocomplete.MAX_RESULTS
+    
+    suggestions = autocomplete.index.suggest(request.GET.get('q', ''), limit=limit)
+    return JsonResponse({'results': suggestions})
+
+def product_feed(request):
+    """JSON "load more" feed: the next page of search results after ``cursor``"""
+    query, products, filterset, paginator = _search_results(request)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    
+    results = []
+    for product in page_obj:
+        picture = product.main_image
+        results.append({
+            'id': product.id,
+            'name': product.name,
+            'url': product.get_absolute_url(),
+            'artist': product.artist.name,
+            'price': str(product.price),
+            'discount_price': str(product.discount_price) if product.discount_price else None,
+            'image': picture.image.url if picture and picture.image else None,
+        })
+    
+    return JsonResponse({
+        'results': results,
+        'next_cursor': page_obj.next_cursor,
+    })
@@ -151,6 +151,61 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Search-as-you-type suggestions for the navbar search box
+    const searchInput = document.querySelector('input[data-autocomplete-url]');
+    if (searchInput) {
+        const suggestionList = document.createElement('div');
+        suggestionList.className = 'list-group search-suggestions d-none';
+        searchInput.parentElement.appendChild(suggestionList);
+        
+        const icons = {category: 'fa-tags', artist: 'fa-user', product: 'fa-box'};
+        let timer = null;
+        let controller = null;
+        
+        searchInput.addEventListener('input', function() {
+            clearTimeout(timer);
+            const query = searchInput.value.trim();
+            if (query.length < 2) {
+                suggestionList.classList.add('d-none');
+                return;
+            }
+            timer = setTimeout(function() {
+                if (controller) {
+                    controller.abort();
+                }
+                controller = new AbortController();
+                const url = `${searchInput.dataset.autocompleteUrl}?q=${encodeURIComponent(query)}`;
+                fetch(url, {signal: controller.signal})
+                    .then(response => response.json())
+                    .then(data => {
+                        suggestionList.innerHTML = '';
+                        data.results.forEach(result => {
+                            const link = document.createElement('a');
+                            link.className = 'list-group-item list-group-item-action';
+                            link.href = result.url;
+                            const icon = document.createElement('i');
+                            icon.className = `fas ${icons[result.type]} me-2 text-muted`;
+                            link.appendChild(icon);
+                            link.appendChild(document.createTextNode(result.label));
+                            suggestionList.appendChild(link);
+                        });
+                        suggestionList.classList.toggle('d-none', data.results.length === 0);
+                    })
+                    .catch(error => {
+                        if (error.name !== 'AbortError') {
+                            console.error('Error:', error);
+                        }
+                    });
+            }, 120);
+        });
+        
+        document.addEventListener('click', function(event) {
+            if (!searchInput.parentElement.contains(event.target)) {
+                suggestionList.classList.add('d-none');
+            }
+        });
+    }
+    
     // RTL support for Arabic
     const htmlElement = document.documentElement;
     if (htmlElement.lang === 'ar') {